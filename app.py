@@ -1,33 +1,112 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import pandas_ta as ta
-from tab1 import show_big_picture_trend
-from tab2 import show_oscillators
-from tab3 import show_volume_confirmation_charts
-from tab4 import show_reversal_continuation_patterns
-from tab5 import show_news_with_sentiment
+from tab1 import show_big_picture_trend, precompute_big_picture_trend
+from tab2 import show_oscillators, precompute_oscillators
+from tab3 import show_volume_confirmation_charts, precompute_volume_confirmation
+from tab4 import show_reversal_continuation_patterns, precompute_reversal_continuation_patterns
+from tab5 import show_news_with_sentiment, precompute_news_with_sentiment
+from data_provider import LatestPriceCache, YahooProvider
+from price_store import PriceStore
+from streaming import StreamConsumer, ReplaySource, SocketSource
+import stages
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Analysis stages are cached across reruns, log which ones run this time.
+# Results this session used are also kept in its own state.
+stages.begin_run(st.session_state.setdefault('stage_results', OrderedDict()))
 
 # Display latest prices for selected tickers
 st.title("Trading Strategy Visualizer")
 tickers_list = ["AAPL", "GOOG", "MSFT", "AMZN", "NVDA", "META"]
-latest_prices = {}
+PRICE_TTL_SECONDS = 60 # How long latest prices are reused before refetching
 
-# Fetch latest price for each ticker
-for t in tickers_list:
-    try:
-        stock = yf.Ticker(t)
-        latest_prices[t] = stock.history(period="1d")['Close'].iloc[-1]
-    except Exception as e:
-        latest_prices[t] = None
-        print(f"Error fetching {t}: {e}")
+# One cache shared by every session, refreshed in the background
+@st.cache_resource
+def get_price_cache(tickers, ttl):
+    return LatestPriceCache(YahooProvider(), tickers, ttl=ttl, background=True)
+
+latest_prices = get_price_cache(tuple(tickers_list), PRICE_TTL_SECONDS).get()
+
+# Local OHLCV store, only bars that are not stored yet are downloaded
+PRICE_STORE_DIR = ".price_store"
+
+@st.cache_resource
+def get_price_store(root):
+    return PriceStore(root, YahooProvider())
+
+# Live streaming mode: ticks from a replay file or a socket update prices and signals incrementally
+STREAM_SEED_PERIOD = "1y" # history the indicators are warmed up on
+
+@st.cache_resource
+def get_stream_consumer(source, tickers):
+    consumer = StreamConsumer()
+    for t in tickers:
+        try:
+            consumer.seed(t, get_price_store(PRICE_STORE_DIR).get(t, STREAM_SEED_PERIOD))
+        except Exception:
+            pass # starts cold, from the first tick
+    if os.path.exists(source) or ":" not in source:
+        consumer.start_in_thread(ReplaySource(source))
+    else:
+        host, port = source.rsplit(":", 1)
+        consumer.start_in_thread(SocketSource(host, int(port)))
+    return consumer
+
+st.sidebar.header("Live Streaming")
+stream_source = st.sidebar.text_input("Replay file or host:port", "")
+if st.sidebar.checkbox("Enable live streaming mode") and stream_source:
+    consumer = get_stream_consumer(stream_source, tuple(tickers_list))
+    latest_prices = {**latest_prices, **consumer.latest_prices}
+    st.sidebar.button("Refresh")
+    if consumer.error is not None:
+        st.sidebar.error(f"Stream stopped: {type(consumer.error).__name__}: {consumer.error}")
+    # The feed thread adds tickers while this runs, iterate over a copy
+    rows = []
+    for t, s in dict(consumer.states).items():
+        patterns = list(s.patterns)
+        rows.append({'Ticker': t, 'Signal': s.signal or "-",
+                     'Last top': f"{s.last_top[1]:.2f} on {s.last_top[0]:%Y-%m-%d}" if s.last_top else "-",
+                     'Last bottom': f"{s.last_bottom[1]:.2f} on {s.last_bottom[0]:%Y-%m-%d}" if s.last_bottom else "-",
+                     'Last pattern': f"{patterns[-1][1]} on {patterns[-1][0]:%Y-%m-%d}" if patterns else "-"})
+    st.sidebar.dataframe(pd.DataFrame(rows), hide_index=True)
+    st.sidebar.json(consumer.metrics.report())
+
+def load_prices(ticker, period, refresh):
+    data = get_price_store(PRICE_STORE_DIR).get(ticker, period)
+    # Part of the key for cached indicators
+    data.attrs['ticker'] = ticker
+    data.attrs['period'] = period
+    return data
+
+# Lazy mode only runs the tab that is open, the others run when first opened
+st.sidebar.header("Tabs")
+lazy_tabs = st.sidebar.checkbox("Only run the open tab", value=True)
+precompute_tabs = st.sidebar.checkbox("Precompute the other tabs in the background", value=False, disabled=not lazy_tabs)
+
+def precompute_in_background(data, ticker):
+    # Only fills the shared caches, nothing is drawn from this thread
+    def run():
+        for precompute, arg in ((precompute_big_picture_trend, data), (precompute_oscillators, data),
+                                (precompute_volume_confirmation, data), (precompute_reversal_continuation_patterns, data),
+                                (precompute_news_with_sentiment, ticker)):
+            try:
+                precompute(arg)
+            except Exception:
+                pass # the tab reports the error when it is opened
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
 
 # Show the latest prices in a nice layout
 st.subheader("Latest Stock Prices")
 cols = st.columns(len(tickers_list))
 for col, t in zip(cols, tickers_list):
-    price = latest_prices[t]
-    col.metric(label=t, value=f"{price:.2f}")
+    price = latest_prices.get(t)
+    col.metric(label=t, value=f"{price:.2f}" if price is not None else "N/A")
 
 # User input for the stock ticker and time period
 ticker = st.text_input("Enter a stock ticker (e.g., AAPL):", "AAPL")
@@ -49,33 +128,54 @@ selected_period = period_options[selected_period_name]
 # Fetch data and handle potential errors
 if ticker:
     try:
-        data = yf.download(ticker, period=selected_period)
-        
-        # Flatten the column headers if needed
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.droplevel(1)
+        # refresh changes once the store would refetch the latest bars, which invalidates the stage
+        refresh = int(time.time() // get_price_store(PRICE_STORE_DIR).refresh_after)
+        data = stages.run('prices', load_prices, ticker, selected_period, refresh=refresh)
 
         if not data.empty and len(data) > 1:
             # Create tabs
-            tab1, tab2, tab3, tab4, tab5 = st.tabs([
+            tab_names = [
                 "Big Picture Trend", 
                 "Oscillators", 
                 "Volume to confirm Price Action",
                 "Reversals & Continuations", 
                 "News & Sentiment"
-            ])
-
-            with tab1:
-                show_big_picture_trend(data)
-            with tab2:
-                show_oscillators(data)
-            with tab3:
-                show_volume_confirmation_charts(data)
-            with tab4:
-                show_reversal_continuation_patterns(data)
-            with tab5:
-                show_news_with_sentiment(ticker)
+            ]
+            if lazy_tabs:
+                # Switching tabs reruns the script, tab.open tells which one is showing
+                tabs = st.tabs(tab_names, key="active_tab", on_change="rerun")
+            else:
+                tabs = st.tabs(tab_names)
+            tab1, tab2, tab3, tab4, tab5 = tabs
+
+            if not lazy_tabs or tab1.open:
+                with tab1:
+                    show_big_picture_trend(data)
+            if not lazy_tabs or tab2.open:
+                with tab2:
+                    show_oscillators(data)
+            if not lazy_tabs or tab3.open:
+                with tab3:
+                    show_volume_confirmation_charts(data)
+            if not lazy_tabs or tab4.open:
+                with tab4:
+                    show_reversal_continuation_patterns(data)
+            if not lazy_tabs or tab5.open:
+                with tab5:
+                    show_news_with_sentiment(ticker, data)
+
+            # Start at most one precompute per session and data
+            if lazy_tabs and precompute_tabs and st.session_state.get('precomputed') != (ticker, selected_period, refresh):
+                st.session_state['precomputed'] = (ticker, selected_period, refresh)
+                precompute_in_background(data, ticker)
         else:
             st.warning("No data found for the selected ticker and period. Please try a different ticker or time period.")
     except Exception as e:
         st.error(f"An error occurred: {e}")
+
+# Debug overlay: which stages were reused or recomputed on this rerun
+if st.sidebar.checkbox("Show stage cache stats"):
+    st.sidebar.subheader("This run")
+    st.sidebar.dataframe(stages.run_log(), hide_index=True)
+    st.sidebar.subheader("Since startup")
+    st.sidebar.dataframe(stages.stats(), hide_index=True)
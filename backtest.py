@@ -0,0 +1,348 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+from tab4 import find_hs_patterns_batch, find_flags_pennants_trendline
+from trendline_automation import rolling_trendlines_high_low
+
+# Daily bars
+PERIODS_PER_YEAR = 252
+
+
+# ---------------- Helpers ----------------
+def moving_averages(close: np.array, windows) -> np.array:
+    """
+    Simple moving averages of close for every window, one row each, from a
+    single cumulative sum. Like rolling(window).mean(), a window is NaN if it
+    isn't full or holds a missing bar, and later windows are not affected.
+    """
+    close = np.asarray(close, dtype=float)
+    valid = ~np.isnan(close)
+    csum = np.concatenate([[0.0], np.cumsum(np.where(valid, close, 0.0))])
+    count = np.concatenate([[0], np.cumsum(valid)])
+    out = np.full((len(windows), len(close)), np.nan)
+    for row, window in enumerate(windows):
+        if window <= len(close):
+            full = count[window:] - count[:-window] == window
+            out[row, window - 1:] = np.where(full, (csum[window:] - csum[:-window]) / window, np.nan)
+    return out
+
+
+def hold_positions(n: int, rows: np.array, entries: np.array, directions: np.array, hold: np.array) -> np.array:
+    """
+    Positions of (max(rows) + 1, n) after entering at each (row, bar) with
+    direction +1/-1 and holding for `hold` bars. Overlapping holds add up
+    and are clipped to one unit.
+    """
+    n_rows = int(rows.max()) + 1 if len(rows) else 0
+    delta = np.zeros(n_rows * (n + 1))
+    flat = rows * (n + 1) + entries
+    np.add.at(delta, flat, directions)
+    np.add.at(delta, rows * (n + 1) + np.minimum(entries + hold, n), -directions)
+    return np.clip(np.cumsum(delta.reshape(n_rows, n + 1)[:, :n], axis=1), -1, 1)
+
+
+def latch_positions(events: np.array) -> np.array:
+    """Holds the last nonzero event of each row: +1 is long until a -1 event, which is flat (long only)."""
+    idx = np.where(events != 0, np.arange(events.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    last = np.take_along_axis(events, idx, axis=1)
+    return (last > 0).astype(float)
+
+
+def recent(events: np.array, window: int) -> np.array:
+    """True where an event happened in the last `window` bars, per row."""
+    counts = np.cumsum(events, axis=-1, dtype=np.int64)
+    shifted = np.zeros_like(counts)
+    shifted[..., window:] = counts[..., :-window]
+    return counts - shifted > 0
+
+
+# ---------------- Signals ----------------
+# Each takes the closes and a DataFrame of parameter combinations, and returns
+# one row of positions (held after each bar's close) per combination.
+def ma_crossover(close: np.array, params: pd.DataFrame) -> np.array:
+    """Long while the short moving average is above the long one, the crossover of plot_moving_averages."""
+    windows, inverse = np.unique(np.concatenate([params['short'], params['long']]), return_inverse=True)
+    ma = moving_averages(close, windows)
+    short, long = inverse[:len(params)], inverse[len(params):]
+    return (ma[short] > ma[long]).astype(float)
+
+
+def breakout(close: np.array, params: pd.DataFrame) -> np.array:
+    """
+    Long for `hold` bars after the close breaks above the resistance line,
+    as in plot_support_resistance. The line is fitted on the `lookback` bars
+    before each bar and extended one bar, so there is no look-ahead.
+    """
+    log_close = np.log(close)
+    n = len(close)
+    out = np.zeros((len(params), n))
+    for lookback, group in params.groupby('lookback').groups.items():
+        _, _, resist_slope, resist_intercept = rolling_trendlines_high_low(log_close, log_close, log_close, lookback)
+        line = np.full(n, np.nan)
+        line[1:] = resist_intercept[:-1] + resist_slope[:-1] * lookback
+        above = log_close > line
+        entries = np.flatnonzero(above[1:] & ~above[:-1]) + 1
+        rows = params.index.get_indexer(group)
+        hold = params.loc[group, 'hold'].to_numpy()
+        if len(entries):
+            out[rows] = hold_positions(n, np.repeat(np.arange(len(rows)), len(entries)), np.tile(entries, len(rows)),
+                                       np.ones(len(rows) * len(entries)), np.repeat(hold, len(entries)))
+    return out
+
+
+def rsi_macd(close: np.array, params: pd.DataFrame) -> np.array:
+    """
+    The strong buy/sell of compare_rsi_and_macd_signals: long once RSI has
+    crossed up through `oversold` and MACD above its signal line within the
+    last `grace` bars, flat once both crossed the other way.
+    """
+    series = pd.Series(close)
+
+    def crossings(values, level):
+        # (up, down) crossings of level, as in compare_rsi_and_macd_signals
+        up = np.zeros(len(values), dtype=bool)
+        down = np.zeros(len(values), dtype=bool)
+        up[1:] = (values[:-1] <= level) & (values[1:] > level)
+        down[1:] = (values[:-1] >= level) & (values[1:] < level)
+        return up, down
+
+    # Each indicator is computed once per distinct setting, the rows only differ in thresholds and grace.
+    # pandas_ta returns None when the series is shorter than the indicator needs, those rows stay flat.
+    rsi = {}
+    for length in params['rsi_length'].unique():
+        values = ta.rsi(series, length=length)
+        rsi[length] = values.to_numpy() if values is not None else None
+    macd = {}
+    for key in params[['fast', 'slow', 'signal']].drop_duplicates().itertuples(index=False):
+        frame = ta.macd(series, fast=key.fast, slow=key.slow, signal=key.signal)
+        macd[tuple(key)] = crossings((frame.iloc[:, 0] - frame.iloc[:, 2]).to_numpy(), 0) if frame is not None else None
+
+    events = np.zeros((len(params), len(close)))
+    for i, row in enumerate(params.itertuples()):
+        if rsi[row.rsi_length] is None or macd[row.fast, row.slow, row.signal] is None:
+            continue
+        rsi_up, _ = crossings(rsi[row.rsi_length], row.oversold)
+        _, rsi_down = crossings(rsi[row.rsi_length], row.overbought)
+        macd_up, macd_down = macd[row.fast, row.slow, row.signal]
+        buy = recent(rsi_up, row.grace) & recent(macd_up, row.grace)
+        sell = recent(rsi_down, row.grace) & recent(macd_down, row.grace)
+        events[i] = buy.astype(float) - sell
+    return latch_positions(events)
+
+
+def patterns(close: np.array, params: pd.DataFrame) -> np.array:
+    """
+    Short after a head and shoulders or bear flag/pennant, long after an
+    inverted head and shoulders or bull flag/pennant, for `hold` bars from
+    the bar the pattern is confirmed (the tab4 detectors on close).
+    """
+    n = len(close)
+    events = {}
+    for hs_order, flag_order in params[['hs_order', 'flag_order']].drop_duplicates().itertuples(index=False):
+        hs, ihs = find_hs_patterns_batch(close, hs_order)
+        bull_flags, bear_flags, bull_pennants, bear_pennants = find_flags_pennants_trendline(close, flag_order)
+        entries = np.concatenate([hs.break_i, ihs.break_i, bull_flags.conf_x, bull_pennants.conf_x,
+                                  bear_flags.conf_x, bear_pennants.conf_x]).astype(int)
+        directions = np.concatenate([-np.ones(len(hs)), np.ones(len(ihs) + len(bull_flags) + len(bull_pennants)),
+                                     -np.ones(len(bear_flags) + len(bear_pennants))])
+        events[hs_order, flag_order] = entries, directions
+
+    out = np.zeros((len(params), n))
+    for i, row in enumerate(params.itertuples()):
+        entries, directions = events[row.hs_order, row.flag_order]
+        if len(entries):
+            out[i] = hold_positions(n, np.zeros(len(entries), dtype=int), entries, directions, np.full(len(entries), row.hold))[0]
+    return out
+
+
+def ma_crossover_sweep(close: np.array, short_windows, long_windows, max_cells: int = 2**22):
+    """
+    Total return of the MA crossover for every (short, long) window pair.
+
+    Every moving average comes from one cumulative sum, O(n) per window.
+    Positions are 0/1, so a pair's log return is its positions times the
+    bars' log returns, and a block of short windows is compared against
+    long windows at once, about max_cells positions per block (the matrix
+    product turns them into float64, 8 bytes each).
+
+    Returns:
+        tuple: (windows, ma, returns). ma has one row per window in windows,
+        returns is a short x long DataFrame, NaN where short >= long.
+    """
+    close = np.asarray(close, dtype=float)
+    short_windows = np.asarray(short_windows, dtype=int)
+    long_windows = np.asarray(long_windows, dtype=int)
+    windows = np.union1d(short_windows, long_windows)
+    ma = moving_averages(close, windows)
+    short, long = np.searchsorted(windows, short_windows), np.searchsorted(windows, long_windows)
+
+    # Position after bar t earns the log return of bar t + 1, as in strategy_returns
+    next_log_return = np.zeros(len(close))
+    next_log_return[:-1] = np.nan_to_num(np.log(close[1:] / close[:-1])) # nothing is earned across a missing bar
+
+    grid = np.empty((len(short), len(long)))
+    n = max(len(close), 1)
+    cols = min(len(long), max(1, max_cells // n))
+    rows = max(1, max_cells // (cols * n))
+    for r in range(0, len(short), rows):
+        for c in range(0, len(long), cols):
+            held = ma[short[r:r + rows]][:, None, :] > ma[long[c:c + cols]][None, :, :]
+            grid[r:r + rows, c:c + cols] = np.expm1(held @ next_log_return)
+    grid[short_windows[:, None] >= long_windows[None, :]] = np.nan
+    returns = pd.DataFrame(grid, index=pd.Index(short_windows, name='short'), columns=pd.Index(long_windows, name='long'))
+    return windows, ma, returns
+
+
+# Signal function and default parameter grid of every strategy
+STRATEGIES = {
+    'ma_crossover': (ma_crossover, {'short': [5, 10, 20], 'long': [20, 50, 100, 200]}),
+    'breakout': (breakout, {'lookback': [20, 30, 60], 'hold': [5, 10, 20]}),
+    'rsi_macd': (rsi_macd, {'rsi_length': [14], 'oversold': [30], 'overbought': [70],
+                            'fast': [12], 'slow': [26], 'signal': [9], 'grace': [3, 10]}),
+    'patterns': (patterns, {'hs_order': [5], 'flag_order': [10], 'hold': [5, 10, 20]}),
+}
+
+
+def param_grid(grid: dict) -> pd.DataFrame:
+    """Every combination of the parameter lists, one row each. MA pairs need short < long."""
+    params = pd.DataFrame(list(itertools.product(*grid.values())), columns=list(grid))
+    if {'short', 'long'} <= set(params.columns):
+        params = params[params['short'] < params['long']]
+    return params.reset_index(drop=True)
+
+
+# ---------------- Metrics ----------------
+def strategy_returns(close: np.array, positions: np.array, cost: float = 0.0) -> np.array:
+    """
+    Per bar returns of every positions row: the position held after the
+    previous close times the bar's return, less `cost` (a fraction) per unit
+    of position traded.
+    """
+    close = np.asarray(close, dtype=float)
+    returns = np.zeros(len(close))
+    returns[1:] = np.nan_to_num(close[1:] / close[:-1] - 1) # nothing is earned across a missing bar
+    held = np.zeros_like(positions)
+    held[:, 1:] = positions[:, :-1]
+    traded = np.abs(np.diff(positions, axis=1, prepend=0.0))
+    return held * returns - cost * traded
+
+
+def equity_curves(close: np.array, positions: np.array, cost: float = 0.0) -> np.array:
+    """Growth of 1 for every positions row."""
+    return np.cumprod(1 + strategy_returns(close, positions, cost), axis=1)
+
+
+def evaluate(close: np.array, positions: np.array, cost: float = 0.0, periods_per_year: int = PERIODS_PER_YEAR) -> pd.DataFrame:
+    """
+    Performance of every positions row: total return, annualized Sharpe
+    ratio, max drawdown, trades, hit rate (share of trades that made money
+    after their entry and exit costs),
+    turnover (units traded per year) and exposure (share of bars in a trade).
+    """
+    positions = np.asarray(positions, dtype=float)
+    n_rows, n = positions.shape
+    strat = strategy_returns(close, positions, cost)
+    equity = np.cumprod(1 + strat, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+    std = strat.std(axis=1)
+    sharpe = np.divide(strat.mean(axis=1), std, out=np.zeros(n_rows), where=std > 0) * np.sqrt(periods_per_year)
+
+    # A trade is a run of the same nonzero position, its bars' log returns are summed by trade id
+    prev = np.zeros_like(positions)
+    prev[:, 1:] = positions[:, :-1]
+    starts = (positions != 0) & (positions != prev)
+    trade_id = (np.cumsum(starts.ravel()) - 1).reshape(n_rows, n)
+    # Cost of the bar where the position changes is split: the units opened
+    # are charged to the trade starting there, the rest (units closed) to the
+    # trade held before
+    traded = np.abs(positions - prev)
+    entry = np.where(starts, np.minimum(np.abs(positions), traded), 0.0)
+    held_growth = np.log1p(strat + cost * entry).ravel()
+    entry_growth = np.log1p(-cost * entry).ravel()
+    # Return of bar t belongs to the trade held after bar t - 1
+    owner = np.full((n_rows, n), -1)
+    owner[:, 1:] = np.where(prev[:, 1:] != 0, trade_id[:, :-1], -1)
+    owner = owner.ravel()
+    n_trades = int(starts.sum())
+    trade_log = np.bincount(owner[owner >= 0], weights=held_growth[owner >= 0], minlength=n_trades)
+    trade_log += np.bincount(trade_id.ravel()[starts.ravel()], weights=entry_growth[starts.ravel()], minlength=n_trades)
+    trade_row = np.repeat(np.arange(n_rows), starts.sum(axis=1))
+    trades = starts.sum(axis=1)
+    wins = np.bincount(trade_row, weights=trade_log > 0, minlength=n_rows)
+
+    years = max(n - 1, 1) / periods_per_year
+    return pd.DataFrame({
+        'total_return': equity[:, -1] - 1,
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.min(axis=1),
+        'trades': trades,
+        'hit_rate': np.divide(wins, trades, out=np.full(n_rows, np.nan), where=trades > 0),
+        'turnover': np.abs(np.diff(positions, axis=1, prepend=0.0)).sum(axis=1) / years,
+        'exposure': (positions != 0).mean(axis=1),
+    })
+
+
+# ---------------- Runs ----------------
+def backtest(close: np.array, strategy: str, grid: dict = None, cost: float = 0.0, chunk_size: int = 512) -> pd.DataFrame:
+    """
+    Runs every parameter combination of a strategy on one price series.
+    Combinations are evaluated in chunks of chunk_size rows to bound memory.
+    Returns one row per combination: the parameters, then the metrics.
+    """
+    signal, default_grid = STRATEGIES[strategy]
+    params = param_grid(grid or default_grid)
+    close = np.asarray(close, dtype=float)
+    results = []
+    for start in range(0, len(params), chunk_size):
+        chunk = params.iloc[start:start + chunk_size].reset_index(drop=True)
+        results.append(pd.concat([chunk, evaluate(close, signal(close, chunk), cost)], axis=1))
+    return pd.concat(results, ignore_index=True) if results else params
+
+
+def _backtest_ticker(task):
+    ticker, close, strategy, grid, cost = task
+    start = time.perf_counter()
+    result = backtest(close, strategy, grid, cost)
+    result.insert(0, 'ticker', ticker)
+    return result, time.perf_counter() - start
+
+
+def backtest_universe(prices, strategy: str, grid: dict = None, cost: float = 0.0, max_workers: int = 1):
+    """
+    Runs a strategy's parameter grid on many tickers.
+
+    Args:
+        prices (dict): ticker -> 1d array of closes (e.g. PriceCube.series views).
+        max_workers (int): Worker processes, 1 runs in this process. None uses every CPU.
+
+    Returns:
+        tuple: (results, timings). results has one row per ticker and
+        parameter combination, timings the seconds spent per ticker.
+    """
+    tasks = [(t, np.asarray(close, dtype=float), strategy, grid, cost) for t, close in prices.items()]
+    workers = max_workers or os.cpu_count() or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_backtest_ticker, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    else:
+        outputs = [_backtest_ticker(task) for task in tasks]
+    results = pd.concat([result for result, _ in outputs], ignore_index=True) if outputs else pd.DataFrame()
+    timings = pd.DataFrame([(t[0], len(t[1]), s) for t, (_, s) in zip(tasks, outputs)], columns=['ticker', 'bars', 'seconds'])
+    return results, timings
+
+
+if __name__ == "__main__":
+    import sys
+    from price_cube import PriceCube
+
+    cube = PriceCube(sys.argv[1])
+    strategy = sys.argv[2] if len(sys.argv) > 2 else 'ma_crossover'
+    start = time.perf_counter()
+    results, timings = backtest_universe({t: cube.series(t, 'Close') for t in cube.tickers}, strategy, max_workers=None)
+    print(results.sort_values('sharpe', ascending=False).head(30).to_string())
+    print(f"Backtested {len(results)} runs on {len(cube.tickers)} tickers in {time.perf_counter() - start:.2f}s")
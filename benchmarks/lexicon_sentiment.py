@@ -0,0 +1,55 @@
+"""
+Vectorized lexicon scoring of synthetic headlines.
+
+    python -m benchmarks.lexicon_sentiment [n_headlines] [sample]
+
+Scores n headlines (default 1M) with lexicon_sentiment.LexiconScorer on one
+core and reports headlines per minute, then checks that the compound scores
+of a sample agree with the per-text FinVADER analyzer sentiment.py uses.
+Headlines mix lexicon words and filler like benchmarks.sentiment_batch, but
+are drawn in bulk so that generating a million of them takes seconds.
+"""
+import sys
+import time
+import numpy as np
+from benchmarks.sentiment_batch import FILLER
+from lexicon_sentiment import Corpus, LexiconScorer, load_lexicon
+from sentiment import _score_chunk
+
+
+def headlines(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    lexicon = np.array(list(load_lexicon()), dtype=object)
+    filler = np.array(FILLER, dtype=object)
+    lengths = rng.integers(6, 14, n)
+    total = int(lengths.sum())
+    words = np.where(rng.random(total) < 0.3, lexicon[rng.integers(0, len(lexicon), total)], filler[rng.integers(0, len(filler), total)])
+    bounds = np.concatenate([[0], np.cumsum(lengths)]).tolist()
+    return [" ".join(words[bounds[i]:bounds[i + 1]]).capitalize() for i in range(n)]
+
+
+def run(n: int = 1_000_000, sample: int = 5_000):
+    texts = headlines(n)
+    scorer = LexiconScorer.finvader()
+    report = {}
+
+    start = time.perf_counter()
+    corpus = Corpus(texts)
+    report['tokenize (s)'] = time.perf_counter() - start
+    start = time.perf_counter()
+    scores = scorer.score_corpus(corpus)
+    report['score (s)'] = time.perf_counter() - start
+    total = report['tokenize (s)'] + report['score (s)']
+    report['headlines/min'] = n / total * 60
+
+    reference = np.array(_score_chunk(texts[:sample]))
+    report['agreement with finvader'] = float(np.mean(np.abs(scores[:sample] - reference) <= 1e-4))
+    report['max abs diff'] = float(np.abs(scores[:sample] - reference).max())
+    return report
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    for label, value in run(n, sample).items():
+        print(f"{label:<28}{value:14,.4f}")
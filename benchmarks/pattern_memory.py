@@ -0,0 +1,70 @@
+"""
+Memory per detected event: dataclass lists vs PatternTable.
+
+    python -m benchmarks.pattern_memory [n_events]
+
+Allocations are measured with tracemalloc, so the numbers include the list
+slots and every boxed int/float/bool a dataclass object holds.
+"""
+import sys
+import tracemalloc
+import numpy as np
+from tab4 import HSPattern, FlagPattern, HS_DTYPE, FLAG_DTYPE, PatternTable
+
+
+def _random_pattern(cls, rng):
+    # Distinct values per field, so small ints/floats aren't shared between objects
+    values = {}
+    for name, (kind, _) in np.dtype(HS_DTYPE if cls is HSPattern else FLAG_DTYPE).fields.items():
+        if kind == np.bool_:
+            values[name] = bool(rng.integers(2))
+        elif kind.kind == 'i':
+            values[name] = int(rng.integers(1000, 10**9))
+        else:
+            values[name] = float(rng.random())
+    return cls(**values)
+
+
+def _measure(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def bench(cls, dtype, n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    template = [_random_pattern(cls, rng) for _ in range(min(n, 1000))]
+    names = dtype.names
+
+    # Fresh objects from the field values, as the detectors create them
+    def dataclasses():
+        return [cls(**{f: getattr(template[k % len(template)], f) + 0 for f in names}) for k in range(n)]
+
+    def table_append():
+        table = PatternTable(dtype)
+        for k in range(n):
+            table.append(template[k % len(template)])
+        return table
+
+    rows = np.rec.fromrecords([tuple(getattr(p, f) for f in names) for p in template], dtype=dtype)
+    rows = rows[np.arange(n) % len(rows)]
+
+    def table_extend():
+        return PatternTable(dtype, rows)
+
+    report = {}
+    for label, build in (('dataclass list', dataclasses), ('PatternTable.append', table_append), ('PatternTable.extend', table_extend)):
+        size, result = _measure(build)
+        report[label] = size / n
+        del result
+    return report
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for cls, dtype in ((HSPattern, HS_DTYPE), (FlagPattern, FLAG_DTYPE)):
+        print(f"{cls.__name__} ({dtype.itemsize} bytes per row), {n} events")
+        for label, per_event in bench(cls, dtype, n).items():
+            print(f"  {label:<22}{per_event:8.1f} bytes/event")
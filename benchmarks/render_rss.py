@@ -0,0 +1,74 @@
+"""
+Resident memory over repeated reruns of the chart-heavy tabs.
+
+    python -m benchmarks.render_rss [reruns] [tickers] [cache_mb]
+
+Each rerun draws tab1 and tab4 for one of `tickers` synthetic frames in turn,
+as Streamlit would on every interaction (bare mode, nothing is sent). With the
+default budget every chart is drawn once and then served from the render
+cache. A small cache_mb makes it evict and redraw constantly, cache_mb=0
+redraws every chart on every rerun (slow). Either way RSS should stay flat
+once warm and no pyplot figure should stay open.
+"""
+import os
+import sys
+import time
+import warnings
+import logging
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import charts
+import tab1
+import tab4
+
+
+def _rss_mb() -> float:
+    # Linux only, current (not peak) resident set size
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def _frame(ticker: str, n: int = 600, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = np.exp(np.cumsum(rng.normal(0, 0.02, n))) * 100
+    data = pd.DataFrame({
+        'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+        'Volume': rng.integers(100_000, 1_000_000, n).astype(float),
+    }, index=pd.bdate_range('2020-01-01', periods=n))
+    data.attrs['ticker'] = ticker
+    data.attrs['period'] = 'bench'
+    return data
+
+
+def run(reruns: int = 1000, tickers: int = 8, cache_mb: float = 64.0, report_every: int = 100):
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.CRITICAL)
+    charts._cache.max_bytes = int(cache_mb * 2**20)
+    frames = [_frame(f"T{k}", seed=k) for k in range(tickers)]
+
+    samples = []
+    start = time.perf_counter()
+    for i in range(1, reruns + 1):
+        data = frames[i % tickers]
+        tab1.show_big_picture_trend(data)
+        tab4.show_reversal_continuation_patterns(data)
+        if i % report_every == 0:
+            samples.append((i, _rss_mb(), len(plt.get_fignums()), time.perf_counter() - start))
+            print(f"{i:>6} {samples[-1][1]:>8.1f} {samples[-1][2]:>10} {samples[-1][3]:>8.1f}", flush=True)
+    return samples
+
+
+if __name__ == "__main__":
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    tickers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    cache_mb = float(sys.argv[3]) if len(sys.argv) > 3 else 64.0
+
+    print(f"{'rerun':>6} {'rss MB':>8} {'open figs':>10} {'seconds':>8}")
+    samples = run(reruns, tickers, cache_mb)
+    cache = charts._cache
+    steady = [rss for i, rss, _, _ in samples if i > reruns // 5] or [samples[-1][1]]
+    print(f"render cache: {cache.hits} hits, {cache.misses} misses, {cache.nbytes / 2**20:.1f} MB held")
+    print(f"steady-state RSS growth: {steady[-1] - steady[0]:+.1f} MB")
@@ -0,0 +1,64 @@
+"""
+Batch FinVADER scoring of synthetic headlines.
+
+    python -m benchmarks.sentiment_batch [n_headlines] [workers]
+
+Compares the per-article finvader() call tab5 used to make (timed on a
+sample and extrapolated) with sentiment.score_texts: cold without a cache,
+cold and warm with the SQLite cache, and cold across a process pool.
+About a third of the headlines repeat, as stories shared between tickers do.
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from finvader import finvader
+from sentiment import ScoreCache, score_texts
+
+FILLER = ["shares", "of", "the", "company", "after", "quarter", "results", "analysts", "said", "on", "stock", "market", "its", "new"]
+
+
+def headlines(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    lexicon = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vader_lexicon", "vader_lexicon.txt")
+    with open(lexicon, encoding="utf-8") as f:
+        words = [line.split("\t")[0] for line in f if line.strip()]
+    unique = [
+        " ".join(rng.choice(words if rng.random() < 0.3 else FILLER) for _ in range(rng.integers(6, 14))).capitalize()
+        for _ in range(int(n * 0.7))
+    ]
+    return [unique[i] for i in rng.integers(0, len(unique), n)]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(n: int = 10_000, workers: int = None, sample: int = 100):
+    texts = headlines(n)
+    workers = workers or os.cpu_count() or 1
+    report = {}
+
+    seconds, reference = _timed(lambda: [finvader(t, use_sentibignomics=True, use_henry=True, indicator="compound") for t in texts[:sample]])
+    report['finvader loop (extrapolated)'] = seconds * n / sample
+
+    seconds, scores = _timed(lambda: score_texts(texts))
+    report['score_texts, no cache'] = seconds
+    assert np.allclose(scores[:sample], reference), "batch scores differ from finvader"
+
+    with tempfile.TemporaryDirectory() as root:
+        cache = ScoreCache(os.path.join(root, "scores.sqlite"))
+        report['score_texts, cold cache'], _ = _timed(lambda: score_texts(texts, cache))
+        report['score_texts, warm cache'], _ = _timed(lambda: score_texts(texts, cache))
+        report[f'score_texts, {workers} workers'], _ = _timed(lambda: score_texts(texts, max_workers=workers, chunk_size=max(n // (4 * workers), 1)))
+    return report
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    for label, seconds in run(n, workers).items():
+        print(f"{label:<32}{seconds:9.2f} s  {n / seconds:10.0f} headlines/s")
@@ -0,0 +1,225 @@
+"""
+Scaling of the core analytics kernels on synthetic prices, with baselines.
+
+    python -m benchmarks.suite [--sizes 1000 ...] [--kernels rw_extremes ...]
+                               [--series gbm regime] [--save] [--threshold 0.25]
+
+Every kernel runs on seeded geometric Brownian motion and regime-switching
+(calm uptrend / volatile downtrend Markov chain) OHLCV series of 1e3 to
+1e6 bars, offline. For each run it records the best wall time of
+`--repeat` runs, the peak traced memory (tracemalloc, numpy included) and
+the number of Python function calls (cProfile), which doesn't depend on
+the machine. Caches are cleared before every run.
+
+--save writes the results to the baseline file. Otherwise, if a baseline
+exists, every run is compared with it and the exit status is 1 when any
+measure is more than --threshold (a fraction) above its baseline.
+"""
+import argparse
+import cProfile
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings("ignore") # pandas_ta and streamlit bare mode warnings
+
+import charts
+import indicators
+import stages
+from backtest import ma_crossover_sweep
+from rolling_window import rw_extremes
+from trendline_automation import fit_trendlines_high_low, rolling_trendlines_high_low
+from tab1 import precompute_big_picture_trend
+from tab2 import precompute_oscillators
+from tab3 import precompute_volume_confirmation
+from tab4 import compute_pattern_r2, find_flags_pennants_trendline, find_hs_patterns, find_hs_patterns_batch
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+# Smaller increases are mostly noise and are never flagged
+MIN_SECONDS = 0.005
+MIN_MB = 1.0
+
+
+# ---------------- Synthetic prices ----------------
+def _ohlcv(log_returns: np.array, rng) -> pd.DataFrame:
+    n = len(log_returns)
+    close = 100 * np.exp(np.cumsum(log_returns))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    wick = np.abs(rng.normal(0, np.abs(log_returns).mean() / 2 + 1e-4, (2, n)))
+    data = pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * np.exp(wick[0]),
+        'Low': np.minimum(open_, close) * np.exp(-wick[1]),
+        'Close': close,
+        'Volume': rng.lognormal(14, 0.5, n).round(),
+    }, index=pd.date_range("2000-01-03", periods=n, freq="min"))
+    return data
+
+
+def gbm(n: int, seed: int = 0, mu: float = 0.0003, sigma: float = 0.015) -> pd.DataFrame:
+    """Geometric Brownian motion, daily drift mu and volatility sigma."""
+    rng = np.random.default_rng(seed)
+    return _ohlcv(rng.normal(mu - sigma**2 / 2, sigma, n), rng)
+
+
+def regime_switching(n: int, seed: int = 0, mu=(0.0008, -0.0015), sigma=(0.008, 0.025), switch=(0.01, 0.04)) -> pd.DataFrame:
+    """Two state Markov chain, a calm uptrend and a volatile downtrend, leaving each with probability `switch`."""
+    rng = np.random.default_rng(seed)
+    # Regime lengths are geometric, so the path is drawn run by run instead of bar by bar
+    state = np.empty(n, dtype=int)
+    i, s = 0, 0
+    while i < n:
+        length = rng.geometric(switch[s])
+        state[i:i + length] = s
+        i, s = i + length, 1 - s
+    mu, sigma = np.asarray(mu)[state], np.asarray(sigma)[state]
+    return _ohlcv(rng.normal(mu - sigma**2 / 2, sigma), rng)
+
+
+SERIES = {'gbm': gbm, 'regime': regime_switching}
+
+
+# ---------------- Kernels ----------------
+def _log_hlc(data):
+    return np.log(data['High'].to_numpy()), np.log(data['Low'].to_numpy()), np.log(data['Close'].to_numpy())
+
+
+def _pattern_r2(data):
+    close = data['Close'].to_numpy()
+    hs, ihs = find_hs_patterns_batch(close, 5)
+    patterns = list(hs) + list(ihs)
+    return lambda: [compute_pattern_r2(close, pat) for pat in patterns]
+
+
+def _tab(precompute):
+    def prepare(data):
+        data = data.copy()
+        data.attrs.update(ticker='BENCH', period='max')
+        return lambda: precompute(data)
+    return prepare
+
+
+# name -> prepare(data) -> run(), only run() is measured
+KERNELS = {
+    'rw_extremes': lambda data: lambda: rw_extremes(data['Close'].to_numpy(), 10),
+    'fit_trendlines_high_low': lambda data: lambda: fit_trendlines_high_low(*_log_hlc(data)),
+    'rolling_trendlines_high_low': lambda data: lambda: rolling_trendlines_high_low(*_log_hlc(data), 30),
+    'find_hs_patterns': lambda data: lambda: find_hs_patterns(data['Close'].to_numpy(), 5),
+    'find_hs_patterns_batch': lambda data: lambda: find_hs_patterns_batch(data['Close'].to_numpy(), 5),
+    'find_flags_pennants_trendline': lambda data: lambda: find_flags_pennants_trendline(data['Close'].to_numpy(), 10),
+    'compute_pattern_r2': _pattern_r2,
+    'ma_crossover_sweep': lambda data: lambda: ma_crossover_sweep(data['Close'].to_numpy(), range(2, 51), range(10, 201, 5)),
+    'tab1_indicators': _tab(precompute_big_picture_trend),
+    'tab2_indicators': _tab(precompute_oscillators),
+    'tab3_indicators': _tab(precompute_volume_confirmation),
+}
+
+
+def _clear_caches():
+    indicators._cache.clear()
+    stages._cache.clear()
+    charts._cache.clear()
+
+
+def measure(run, repeat: int = 3) -> dict:
+    """Best wall time of `repeat` runs, then peak traced memory and function calls of one run each."""
+    seconds = []
+    for _ in range(repeat):
+        _clear_caches()
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+
+    _clear_caches()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    _clear_caches()
+    profile = cProfile.Profile()
+    profile.runcall(run)
+    calls = pstats.Stats(profile).total_calls
+    return {'seconds': min(seconds), 'peak_mb': peak / 2**20, 'calls': calls}
+
+
+# ---------------- Baselines ----------------
+def compare(results: dict, baseline: dict, threshold: float):
+    """Runs with a measure more than `threshold` above baseline, as (run, measure, baseline, now)."""
+    regressions = []
+    for run, now in results.items():
+        base = baseline.get(run)
+        if base is None:
+            continue
+        for measure_name, value in now.items():
+            limit = base[measure_name] * (1 + threshold)
+            if value - base[measure_name] < {'seconds': MIN_SECONDS, 'peak_mb': MIN_MB}.get(measure_name, 0):
+                continue
+            if value > limit:
+                regressions.append((run, measure_name, base[measure_name], value))
+    return regressions
+
+
+def run_suite(sizes=SIZES, kernels=None, series=None, repeat: int = 3, seed: int = 0, report=print) -> dict:
+    results = {}
+    for kind in series or SERIES:
+        for n in sizes:
+            data = SERIES[kind](n, seed)
+            for name in kernels or KERNELS:
+                run = KERNELS[name](data)
+                key = f"{name}/{kind}/{n}"
+                results[key] = measure(run, repeat)
+                report(f"{key:<52}{results[key]['seconds']:10.4f} s {results[key]['peak_mb']:9.1f} MB {results[key]['calls']:>10} calls")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--kernels", nargs="+", choices=list(KERNELS), default=None)
+    parser.add_argument("--series", nargs="+", choices=list(SERIES), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.kernels, args.series, args.repeat, args.seed)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save:
+        # Runs not repeated this time keep their old baseline
+        baseline.setdefault('results', {}).update(results)
+        baseline['machine'] = {'python': platform.python_version(), 'numpy': np.__version__,
+                               'pandas': pd.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count()}
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f"Saved {len(results)} runs to {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"No baseline at {args.baseline}, run with --save to create one")
+        return 0
+
+    regressions = compare(results, baseline['results'], args.threshold)
+    for run, measure_name, base, value in regressions:
+        print(f"REGRESSION {run} {measure_name}: {base:.4g} -> {value:.4g} ({value / base - 1:+.0%})")
+    print(f"{len(regressions)} regressions over {args.threshold:.0%} in {len(results)} runs")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
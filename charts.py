@@ -0,0 +1,79 @@
+import io
+import threading
+from collections import OrderedDict
+import matplotlib.pyplot as plt
+import pandas as pd
+import streamlit as st
+from indicators import fingerprint
+
+
+class RenderCache:
+    """
+    LRU cache of rendered figures as PNG or SVG bytes, shared by every session.
+
+    A chart is drawn once per key and then served as an image, so reruns skip
+    matplotlib/mplfinance entirely. Entries are evicted oldest first once the
+    stored bytes exceed max_bytes. Figures are always closed after saving,
+    also when drawing fails, so pyplot never holds on to them.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock() # pyplot state isn't thread safe
+
+    def get(self, key, draw, fmt: str = 'png', dpi: int = 100) -> bytes:
+        """Returns the image for key, calling draw() -> Figure only on a miss."""
+        key = (key, fmt, dpi)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        with self._render_lock:
+            fig = None
+            try:
+                fig = draw()
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+                image = buffer.getvalue()
+            finally:
+                if fig is not None:
+                    plt.close(fig)
+
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries:
+                self._entries[key] = image
+                self.nbytes += len(image)
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self.nbytes -= len(old)
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+_cache = RenderCache()
+
+
+def figure_key(data: pd.DataFrame, name: str, *params):
+    """Key of a chart of `data`: ticker, period, data fingerprint, chart name (and pattern id) and params."""
+    return (data.attrs.get('ticker'), data.attrs.get('period'), fingerprint(data), name, params)
+
+
+def show_figure(data: pd.DataFrame, name: str, draw, *params, fmt: str = 'png'):
+    """Displays the chart drawn by draw() -> Figure, rendering it only if it isn't cached yet."""
+    image = _cache.get(figure_key(data, name, *params), draw, fmt=fmt)
+    if fmt == 'svg':
+        st.image(image.decode())
+    else:
+        st.image(image)
@@ -0,0 +1,130 @@
+import threading
+import time
+import yfinance as yf
+import pandas as pd
+
+
+# ---------------- Providers ----------------
+class DataProvider:
+    """Interface for market data sources used by the app."""
+
+    def latest_prices(self, tickers):
+        """Returns a dict of ticker -> latest close (None if unavailable)."""
+        raise NotImplementedError
+
+    def download(self, ticker, period=None, start=None, end=None):
+        """Returns an OHLCV DataFrame indexed by date with flat column names."""
+        raise NotImplementedError
+
+
+def flatten_columns(data: pd.DataFrame) -> pd.DataFrame:
+    """Drops the ticker level yfinance adds to single ticker downloads."""
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.droplevel(1)
+    return data
+
+
+class YahooProvider(DataProvider):
+    """Yahoo Finance through yfinance."""
+
+    def latest_prices(self, tickers):
+        tickers = list(tickers)
+        # One batched request for every symbol. 5 days covers weekends and holidays.
+        data = yf.download(tickers, period="5d", progress=False, threads=True)
+        close = data['Close'] if not data.empty else pd.DataFrame()
+        if isinstance(close, pd.Series):
+            close = close.to_frame(tickers[0])
+
+        prices = {}
+        for t in tickers:
+            series = close[t].dropna() if t in close else pd.Series(dtype=float)
+            prices[t] = float(series.iloc[-1]) if not series.empty else None
+        return prices
+
+    def download(self, ticker, period=None, start=None, end=None):
+        data = yf.download(ticker, period=period, start=start, end=end, progress=False)
+        return flatten_columns(data)
+
+
+class FrameProvider(DataProvider):
+    """Serves prices from in-memory DataFrames. Used as a local stub and for replays."""
+
+    def __init__(self, frames):
+        self.frames = frames # ticker -> OHLCV DataFrame
+
+    def latest_prices(self, tickers):
+        prices = {}
+        for t in tickers:
+            frame = self.frames.get(t)
+            prices[t] = float(frame['Close'].iloc[-1]) if frame is not None and not frame.empty else None
+        return prices
+
+    def download(self, ticker, period=None, start=None, end=None):
+        frame = self.frames.get(ticker)
+        if frame is None:
+            return pd.DataFrame()
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame.index < pd.Timestamp(end)]
+        return frame.copy()
+
+
+# ---------------- Latest Price Cache ----------------
+class LatestPriceCache:
+    """
+    Latest prices for a fixed list of tickers, shared by every session.
+
+    Prices are fetched in one batched provider call and reused until they are
+    older than `ttl` seconds. With `background=True` a daemon thread refreshes
+    them every `ttl` seconds so page renders never wait on the network.
+    """
+
+    def __init__(self, provider: DataProvider, tickers, ttl: float = 60.0, background: bool = False):
+        self.provider = provider
+        self.tickers = list(tickers)
+        self.ttl = ttl
+        self.prices = {}
+        self.updated_at = None # time.monotonic() of the last successful refresh
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if background:
+            self.start()
+
+    def refresh(self):
+        try:
+            prices = self.provider.latest_prices(self.tickers)
+        except Exception as e:
+            print(f"Error fetching latest prices: {e}")
+            return self.prices
+        with self._lock:
+            self.prices = prices
+            self.updated_at = time.monotonic()
+        return prices
+
+    def is_stale(self):
+        return self.updated_at is None or time.monotonic() - self.updated_at >= self.ttl
+
+    def get(self):
+        """Returns the cached prices, refreshing first if they are stale."""
+        background = self._thread is not None and self._thread.is_alive()
+        if self.updated_at is None or (self.is_stale() and not background):
+            return self.refresh()
+        with self._lock:
+            return dict(self.prices)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.ttl):
+            self.refresh()
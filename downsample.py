@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Points sent per chart, about two per horizontal pixel of a full width chart
+MAX_POINTS = 1500
+
+
+def lttb_indices(y: np.array, n_out: int) -> np.array:
+    """
+    Largest-Triangle-Three-Buckets: positions of n_out points that keep the
+    visual shape of y. The first and last points are always kept. Between
+    them the series is cut into n_out - 2 buckets, and each bucket keeps the
+    point forming the largest triangle with the point kept in the previous
+    bucket and the mean of the next bucket. x is the bar position.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    edges = (np.floor(np.arange(n_out - 1) * every) + 1).astype(int) # bucket b is [edges[b], edges[b + 1])
+    x = np.arange(n, dtype=float)
+
+    # Mean of every bucket, the last "next bucket" is what is left after the buckets (the last point)
+    sums = np.add.reduceat(y[:edges[-1]], edges[:-1])
+    counts = np.diff(edges)
+    next_x = np.append((edges[:-1] + edges[1:] - 1) / 2.0, (edges[-1] + n - 1) / 2.0)[1:]
+    next_y = np.append(sums / counts, y[edges[-1]:].mean())[1:]
+
+    out = np.empty(n_out, dtype=int)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Twice the triangle area, the constant factor doesn't change the argmax
+        area = np.abs((x[a] - next_x[b]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[b] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+
+def minmax_indices(y: np.array, n_out: int) -> np.array:
+    """
+    Positions of the min and max of each of n_out // 2 buckets, in order.
+    Keeps every spike, which LTTB can smooth away, so it suits volume bars.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    n_buckets = n_out // 2
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    width = int(np.diff(edges).max())
+
+    # Pad every bucket to the same width so argmin/argmax run on a 2d block
+    pos = np.minimum(edges[:-1, None] + np.arange(width), edges[1:, None] - 1)
+    block = y[pos]
+    lo = pos[np.arange(n_buckets), np.argmin(block, axis=1)]
+    hi = pos[np.arange(n_buckets), np.argmax(block, axis=1)]
+    return np.unique(np.concatenate([lo, hi]))
+
+
+def _indices(values: np.array, n_out: int, method: str) -> np.array:
+    # NaN bars (e.g. indicator warm up) are skipped, not drawn
+    valid = np.flatnonzero(~np.isnan(values))
+    pick = lttb_indices if method == 'lttb' else minmax_indices
+    return valid[pick(values[valid], n_out)]
+
+
+def downsample(data, n_out: int = MAX_POINTS, method: str = 'lttb'):
+    """
+    Reduces a Series or DataFrame to about n_out rows for charting.
+
+    method is 'lttb' (lines) or 'minmax' (bars, keeps peaks). For a
+    DataFrame the rows picked for every column are kept, so each column
+    keeps its own shape. Only for display, signals use the full data.
+    None (e.g. an indicator with too few bars) is returned as is.
+    """
+    if data is None or len(data) <= n_out:
+        return data
+    if method not in ('lttb', 'minmax'):
+        raise ValueError(f"Unknown downsampling method: {method}")
+    columns = [data] if isinstance(data, pd.Series) else [data[c] for c in data.columns]
+    budget = max(n_out // len(columns), 3)
+    rows = np.unique(np.concatenate([_indices(c.to_numpy(dtype=float), budget, method) for c in columns]))
+    return data.iloc[rows]
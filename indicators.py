@@ -0,0 +1,290 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict, deque
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+
+
+# ---------------- Cache ----------------
+class IndicatorCache:
+    """
+    LRU cache of indicator results shared by every tab and session.
+
+    Keys are (ticker, period, data fingerprint, indicator name, params), so a
+    result is reused until the underlying data changes, and changing one
+    parameter only recomputes that one indicator.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = _read_only(compute())
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _read_only(value):
+    """Copies the result into arrays that can't be written, so no tab can change a shared result."""
+    if isinstance(value, pd.Series):
+        values = value.to_numpy(copy=True)
+        values.flags.writeable = False
+        return pd.Series(values, index=value.index, name=value.name, copy=False)
+    if isinstance(value, pd.DataFrame):
+        return pd.DataFrame({col: _read_only(value[col]) for col in value.columns}, index=value.index)
+    return value
+
+
+# id(frame) -> (weakref to frame, fingerprint). Not kept in data.attrs since
+# pandas copies attrs onto slices like data.tail(), which hold different data.
+_fingerprints = {}
+
+
+def fingerprint(data: pd.DataFrame) -> str:
+    """Content hash of the data, computed once per frame object."""
+    entry = _fingerprints.get(id(data))
+    if entry is not None and entry[0]() is data:
+        return entry[1]
+    hashes = pd.util.hash_pandas_object(data, index=True).to_numpy()
+    fp = f"{len(data)}-{hashlib.blake2b(hashes.tobytes(), digest_size=8).hexdigest()}"
+    key = id(data)
+    _fingerprints[key] = (weakref.ref(data, lambda _: _fingerprints.pop(key, None)), fp)
+    return fp
+
+
+_cache = IndicatorCache()
+
+
+def _cached(data: pd.DataFrame, name: str, params: tuple, compute):
+    key = (data.attrs.get('ticker'), data.attrs.get('period'), fingerprint(data), name, params)
+    return _cache.get(key, compute)
+
+
+# ---------------- Indicators ----------------
+def rsi(data: pd.DataFrame, length: int = 14) -> pd.Series:
+    return _cached(data, 'rsi', (length,), lambda: ta.rsi(data['Close'], length=length))
+
+
+def macd(data: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
+    def compute():
+        macd_df = ta.macd(data['Close'], fast=fast, slow=slow, signal=signal)
+        return macd_df if macd_df is not None else pd.DataFrame()
+    return _cached(data, 'macd', (fast, slow, signal), compute)
+
+
+def obv(data: pd.DataFrame) -> pd.Series:
+    return _cached(data, 'obv', (), lambda: ta.obv(data['Close'], data['Volume']))
+
+
+def sma(data: pd.DataFrame, column: str = 'Close', length: int = 20) -> pd.Series:
+    return _cached(data, 'sma', (column, length), lambda: ta.sma(data[column], length=length))
+
+
+def rolling_mean(data: pd.DataFrame, column: str = 'Close', window: int = 20) -> pd.Series:
+    return _cached(data, 'rolling_mean', (column, window), lambda: data[column].rolling(window=window).mean())
+
+
+def log_prices(data: pd.DataFrame, column: str = 'Close') -> pd.Series:
+    return _cached(data, 'log', (column,), lambda: np.log(data[column]))
+
+
+# ---------------- Incremental ----------------
+class _Incremental:
+    """
+    Base for indicators that carry their state from bar to bar in O(1).
+
+    update() appends a new bar, revise() replaces the latest bar (e.g. an
+    intraday refresh of today's candle) by replaying it from the state
+    before that bar. Subclasses implement _step(state, *bar) -> state, with
+    the current output as the last item of the state.
+    """
+
+    def __init__(self, state):
+        self._state = state
+        self._prev = state
+
+    def _step(self, state, *bar):
+        raise NotImplementedError
+
+    @property
+    def value(self):
+        return self._state[-1]
+
+    def update(self, *bar):
+        self._prev = self._state
+        self._state = self._step(self._state, *bar)
+        return self.value
+
+    def revise(self, *bar):
+        self._state = self._step(self._prev, *bar)
+        return self.value
+
+
+class IncrementalSMA(_Incremental):
+    """ta.sma: mean of the last `length` values, NaN until `length` values are seen."""
+
+    def __init__(self, length: int = 20):
+        self.length = length
+        self._window = deque()
+        self._total = 0.0
+        super().__init__((np.nan,))
+
+    # The window is kept outside the state so a step doesn't copy it
+    def update(self, x):
+        self._window.append(x)
+        self._total += x
+        if len(self._window) > self.length:
+            self._total -= self._window.popleft()
+        self._state = (self._total / self.length if len(self._window) == self.length else np.nan,)
+        return self.value
+
+    def revise(self, x):
+        self._total += x - self._window[-1]
+        self._window[-1] = x
+        self._state = (self._total / self.length if len(self._window) == self.length else np.nan,)
+        return self.value
+
+
+class IncrementalEMA(_Incremental):
+    """ta.ema: seeded with the SMA of the first `length` values, then alpha = 2 / (length + 1)."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        super().__init__((0, 0.0, np.nan)) # (count, seed sum, ema)
+
+    def _step(self, state, x):
+        count, seed, ema = state
+        count += 1
+        if count < self.length:
+            return (count, seed + x, np.nan)
+        if count == self.length:
+            return (count, seed + x, (seed + x) / self.length)
+        return (count, seed, ema + self.alpha * (x - ema))
+
+
+class IncrementalRMA(_Incremental):
+    """Wilder smoothing as in ta.rma: starts at the first value, then alpha = 1 / length."""
+
+    def __init__(self, length: int):
+        self.alpha = 1.0 / length
+        super().__init__((np.nan,))
+
+    def _step(self, state, x):
+        rma = state[0]
+        return (x if np.isnan(rma) else rma + self.alpha * (x - rma),)
+
+
+class IncrementalRSI(_Incremental):
+    """ta.rsi with the default Wilder smoothing."""
+
+    def __init__(self, length: int = 14):
+        self.length = length
+        self._rma = IncrementalRMA(length) # only used for its _step
+        super().__init__((np.nan, (np.nan,), (np.nan,), np.nan)) # (previous close, gains rma, losses rma, rsi)
+
+    def _step(self, state, close):
+        prev_close, pos_state, neg_state, _ = state
+        if np.isnan(prev_close):
+            return (close, pos_state, neg_state, np.nan)
+        change = close - prev_close
+        pos_state = self._rma._step(pos_state, max(change, 0.0))
+        neg_state = self._rma._step(neg_state, min(change, 0.0))
+        pos, neg = pos_state[-1], abs(neg_state[-1])
+        rsi = 100.0 * pos / (pos + neg) if pos + neg != 0 else np.nan
+        return (close, pos_state, neg_state, rsi)
+
+
+class IncrementalMACD(_Incremental):
+    """ta.macd: value is (macd, histogram, signal), the signal EMA starts at the first valid MACD."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self._fast, self._slow, self._signal = IncrementalEMA(fast), IncrementalEMA(slow), IncrementalEMA(signal)
+        super().__init__((self._fast._state, self._slow._state, self._signal._state, (np.nan, np.nan, np.nan)))
+
+    def _step(self, state, close):
+        fast_state, slow_state, signal_state, _ = state
+        fast_state = self._fast._step(fast_state, close)
+        slow_state = self._slow._step(slow_state, close)
+        macd = fast_state[-1] - slow_state[-1]
+        if not np.isnan(macd):
+            signal_state = self._signal._step(signal_state, macd)
+        signal = signal_state[-1]
+        return (fast_state, slow_state, signal_state, (macd, macd - signal, signal))
+
+
+class IncrementalOBV(_Incremental):
+    """ta.obv: running sum of volume signed by the close-to-close change, NaN on the first bar."""
+
+    def __init__(self):
+        super().__init__((np.nan, 0.0, np.nan)) # (previous close, running total, obv)
+
+    def _step(self, state, close, volume):
+        prev_close, total, _ = state
+        if np.isnan(prev_close):
+            return (close, total, np.nan)
+        total += np.sign(close - prev_close) * volume
+        return (close, total, total)
+
+
+class IncrementalIndicators:
+    """
+    Bundle of the indicators shown in tab2 and tab3, updated bar by bar.
+
+    Seed it once from history with from_data(), then call update() for each
+    new bar or revise() when the latest bar changes. Both are O(1).
+    """
+
+    def __init__(self, rsi_length: int = 14, volume_sma_length: int = 20):
+        self.rsi = IncrementalRSI(rsi_length)
+        self.macd = IncrementalMACD()
+        self.obv = IncrementalOBV()
+        self.volume_sma = IncrementalSMA(volume_sma_length)
+
+    @classmethod
+    def from_data(cls, data: pd.DataFrame, **kwargs):
+        state = cls(**kwargs)
+        for close, volume in zip(data['Close'].to_numpy(dtype=float), data['Volume'].to_numpy(dtype=float)):
+            state.update(close, volume)
+        return state
+
+    def _values(self):
+        macd, hist, signal = self.macd.value
+        return {
+            'RSI': self.rsi.value,
+            'MACD': macd,
+            'Histogram': hist,
+            'Signal Line': signal,
+            'OBV': self.obv.value,
+            'Volume_SMA': self.volume_sma.value,
+        }
+
+    def update(self, close: float, volume: float):
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.obv.update(close, volume)
+        self.volume_sma.update(volume)
+        return self._values()
+
+    def revise(self, close: float, volume: float):
+        self.rsi.revise(close)
+        self.macd.revise(close)
+        self.obv.revise(close, volume)
+        self.volume_sma.revise(volume)
+        return self._values()
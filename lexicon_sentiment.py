@@ -0,0 +1,292 @@
+import os
+import string
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+VADER_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vader_lexicon", "vader_lexicon.txt")
+
+# Constants and word lists of nltk's VADER (nltk.sentiment.vader.VaderConstants)
+B_INCR = 0.293
+B_DECR = -0.293
+C_INCR = 0.733
+N_SCALAR = -0.74
+NEGATE = {
+    "aint", "arent", "cannot", "cant", "couldnt", "darent", "didnt", "doesnt",
+    "ain't", "aren't", "can't", "couldn't", "daren't", "didn't", "doesn't",
+    "dont", "hadnt", "hasnt", "havent", "isnt", "mightnt", "mustnt", "neither",
+    "don't", "hadn't", "hasn't", "haven't", "isn't", "mightn't", "mustn't",
+    "neednt", "needn't", "never", "none", "nope", "nor", "not", "nothing", "nowhere",
+    "oughtnt", "shant", "shouldnt", "uhuh", "wasnt", "werent",
+    "oughtn't", "shan't", "shouldn't", "uh-uh", "wasn't", "weren't",
+    "without", "wont", "wouldnt", "won't", "wouldn't", "rarely", "seldom", "despite",
+}
+BOOSTER_DICT = {
+    **dict.fromkeys([
+        "absolutely", "amazingly", "awfully", "completely", "considerably", "decidedly", "deeply",
+        "effing", "enormously", "entirely", "especially", "exceptionally", "extremely", "fabulously",
+        "flipping", "flippin", "fricking", "frickin", "frigging", "friggin", "fully", "fucking",
+        "greatly", "hella", "highly", "hugely", "incredibly", "intensely", "majorly", "more", "most",
+        "particularly", "purely", "quite", "really", "remarkably", "so", "substantially", "thoroughly",
+        "totally", "tremendously", "uber", "unbelievably", "unusually", "utterly", "very",
+    ], B_INCR),
+    **dict.fromkeys([
+        "almost", "barely", "hardly", "just enough", "kind of", "kinda", "kindof", "kind-of", "less",
+        "little", "marginally", "occasionally", "partly", "scarcely", "slightly", "somewhat",
+        "sort of", "sorta", "sortof", "sort-of",
+    ], B_DECR),
+}
+SPECIAL_CASE_IDIOMS = {
+    "the shit": 3, "the bomb": 3, "bad ass": 1.5, "yeah right": -2,
+    "cut the mustard": 2, "kiss of death": -1.5, "hand to mouth": -2,
+}
+PUNC_LIST = [".", "!", "?", ",", ";", ":", "-", "'", '"', "!!", "!!!", "??", "???", "?!?", "!?!", "?!?!", "!?!?"]
+
+
+def load_lexicon(path: str = VADER_LEXICON_PATH) -> dict:
+    """word -> valence from a VADER lexicon file (word, mean, std, ratings; tab separated)."""
+    lexicon = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                word, measure = line.strip().split("\t")[0:2]
+                lexicon[word] = float(measure)
+    return lexicon
+
+
+def finvader_lexicon(path: str = VADER_LEXICON_PATH) -> dict:
+    """The VADER lexicon extended like finvader(use_sentibignomics=True, use_henry=True)."""
+    from finvader import lexicon1, lexicon2
+    lexicon = load_lexicon(path)
+    lexicon.update({**{word: value * 0.1 for word, value in lexicon1().items()}, **lexicon2()})
+    return lexicon
+
+
+def _strip_punctuation(token: str) -> str:
+    # SentiText._words_and_emoticons: "cat," -> "cat" when the rest is a punctuation free word
+    punctuation = set(string.punctuation)
+    for p in PUNC_LIST:
+        for word in (token[len(p):] if token.startswith(p) else None, token[:-len(p)] if token.endswith(p) else None):
+            if word and len(word) > 1 and not punctuation.intersection(word):
+                return word
+    return token
+
+
+class Corpus:
+    """
+    A list of texts tokenized once: one entry per kept token, in order.
+
+    doc/pos/term are the coordinates of a sparse document-term matrix (COO),
+    term indexes `words`. Per-term properties are computed once per distinct
+    word, then gathered to the tokens.
+    """
+
+    def __init__(self, texts):
+        texts = list(texts)
+        splits = [text.split() for text in texts]
+        lengths = np.fromiter(map(len, splits), dtype=np.int64, count=len(splits))
+        raw_ids, raw_words = pd.factorize(pd.Series(list(chain.from_iterable(splits)), dtype=object), sort=False)
+        doc = np.repeat(np.arange(len(texts)), lengths)
+
+        # Tokens of one character are dropped, punctuation around words is removed
+        raw_words = list(raw_words)
+        keep = np.array([len(w) > 1 for w in raw_words], dtype=bool)
+        mapped = [_strip_punctuation(w) for w in raw_words]
+        self.words, mapped_ids = _unique(mapped)
+
+        kept = keep[raw_ids] if len(raw_ids) else np.zeros(0, dtype=bool)
+        self.doc = doc[kept]
+        self.term = mapped_ids[raw_ids[kept]]
+        self.n_docs = len(texts)
+        self.lengths = np.bincount(self.doc, minlength=self.n_docs)
+        self.starts = np.concatenate([[0], np.cumsum(self.lengths)[:-1]])
+        self.pos = np.arange(len(self.doc)) - self.starts[self.doc]
+
+        # Punctuation emphasis is counted on the raw text
+        self.exclamations = np.fromiter((t.count("!") for t in texts), dtype=np.int64, count=len(texts))
+        self.questions = np.fromiter((t.count("?") for t in texts), dtype=np.int64, count=len(texts))
+
+    def term_ids(self, phrase: str):
+        """Term ids of the words of phrase, None when one of them never occurs."""
+        index = getattr(self, '_index', None)
+        if index is None:
+            index = self._index = {w: i for i, w in enumerate(self.words)}
+        ids = [index.get(w) for w in phrase.split(" ")]
+        return None if None in ids else ids
+
+
+def _unique(values):
+    index = {}
+    ids = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=len(values))
+    return list(index), ids
+
+
+class LexiconScorer:
+    """
+    Vectorized VADER compound scores for large batches of headlines.
+
+    Instead of walking every string, the corpus is tokenized once into
+    (doc, pos, term) arrays and the lexicon valence of each term is gathered
+    onto the tokens, so the raw document score is the sparse doc-term matrix
+    times the valence vector. VADER's rules (ALL CAPS emphasis, boosters and
+    dampeners up to 3 words back, negation, "never so", "least", idioms,
+    "but" and !/? emphasis) are applied as array corrections on the token
+    values before summing per document. Matches nltk's SentimentIntensityAnalyzer
+    (as used by finvader), including its quirks.
+    """
+
+    def __init__(self, lexicon: dict = None):
+        self.lexicon = load_lexicon() if lexicon is None else lexicon
+
+    @classmethod
+    def finvader(cls, path: str = VADER_LEXICON_PATH):
+        return cls(finvader_lexicon(path))
+
+    def _term_properties(self, words):
+        lower = [w.lower() for w in words]
+        in_lexicon = np.array([w in self.lexicon for w in lower], dtype=bool)
+        return {
+            'valence': np.array([self.lexicon.get(w, 0.0) for w in lower]),
+            'in_lexicon': in_lexicon,
+            'booster': np.array([BOOSTER_DICT.get(w, 0.0) for w in lower]),
+            'skip': np.array([w in BOOSTER_DICT for w in lower], dtype=bool),
+            'negated': np.array([w in NEGATE or "n't" in w for w in lower], dtype=bool),
+            'upper': np.array([w.isupper() for w in words], dtype=bool),
+            'kind': np.array([w == "kind" for w in lower], dtype=bool),
+            'of': np.array([w == "of" for w in lower], dtype=bool),
+            'least': np.array([w == "least" for w in lower], dtype=bool),
+            'at_very': np.array([w in ("at", "very") for w in lower], dtype=bool),
+            'but': np.array([w == "but" for w in lower], dtype=bool),
+            'never': np.array([w == "never" for w in words], dtype=bool), # case sensitive in VADER
+            'so_this': np.array([w in ("so", "this") for w in words], dtype=bool),
+        }
+
+    def token_valences(self, corpus: Corpus, props: dict = None) -> np.array:
+        """Valence of every token after VADER's rules, before the "but" weighting."""
+        props = self._term_properties(corpus.words) if props is None else props
+        term, pos, n = corpus.term, corpus.pos, len(corpus.term)
+
+        def at(name, k):
+            # Property of the token k places before (k < 0) or after, False/0 outside the document
+            values = props[name][term]
+            out = np.zeros(n, dtype=values.dtype)
+            if k < 0:
+                out[-k:] = values[:k]
+                out[pos < -k] = 0
+            else:
+                if k:
+                    out[:-k] = values[k:]
+                    out[pos >= corpus.lengths[corpus.doc] - k] = 0
+                else:
+                    out[:] = values
+            return out
+
+        def same_term(k, term_id):
+            # Token k places away is term_id (inside the document)
+            shifted = np.full(n, -1)
+            if k < 0:
+                shifted[-k:] = term[:k]
+                shifted[pos < -k] = -1
+            else:
+                shifted[:-k] = term[k:]
+                shifted[pos >= corpus.lengths[corpus.doc] - k] = -1
+            return shifted == term_id
+
+        cap_diff = np.bincount(corpus.doc, weights=at('upper', 0), minlength=corpus.n_docs)
+        cap_diff = ((cap_diff > 0) & (cap_diff < corpus.lengths))[corpus.doc]
+
+        v = at('valence', 0)
+        scored = at('in_lexicon', 0) & ~at('skip', 0) & ~(at('kind', 0) & at('of', 1))
+        caps = at('upper', 0) & cap_diff
+        v = np.where(caps, np.where(v > 0, v + C_INCR, v - C_INCR), v)
+
+        for k in range(3):
+            # Only words that aren't in the lexicon modify the valence
+            active = scored & (pos > k) & ~at('in_lexicon', -(k + 1))
+            s = at('booster', -(k + 1))
+            s = np.where(v < 0, -s, s)
+            boosted_caps = (s != 0) & at('upper', -(k + 1)) & cap_diff
+            s = np.where(boosted_caps, np.where(v > 0, s + C_INCR, s - C_INCR), s)
+            s = s * (1.0, 0.95, 0.9)[k]
+            v = np.where(active, v + s, v)
+
+            negated = at('negated', -(k + 1))
+            if k == 0:
+                v = np.where(active & negated, v * N_SCALAR, v)
+            elif k == 1:
+                never_so = at('never', -2) & at('so_this', -1)
+                v = np.where(active & never_so, v * 1.5, np.where(active & ~never_so & negated, v * N_SCALAR, v))
+            else:
+                never_so = (at('never', -3) & at('so_this', -2)) | at('so_this', -1)
+                v = np.where(active & never_so, v * 1.25, np.where(active & ~never_so & negated, v * N_SCALAR, v))
+                v = self._idioms(corpus, v, active, same_term)
+
+        least1 = (pos > 1) & ~at('in_lexicon', -1) & at('least', -1)
+        least0 = (pos == 1) & ~at('in_lexicon', -1) & at('least', -1)
+        v = np.where(scored & ((least1 & ~at('at_very', -2)) | least0), v * N_SCALAR, v)
+        v = np.where(scored, v, 0.0)
+
+        # VADER scores a repeated word with the context of its first occurrence
+        key = corpus.doc * len(corpus.words) + term
+        order = np.argsort(key, kind='stable')
+        sorted_key = key[order]
+        group_start = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+        first = np.empty(n, dtype=np.int64)
+        first[order] = order[np.repeat(group_start, np.diff(np.r_[group_start, n]))]
+        return v[first]
+
+    @staticmethod
+    def _idioms(corpus, v, active, same_term):
+        def phrase(words, offsets):
+            ids = corpus.term_ids(" ".join(words))
+            if ids is None:
+                return np.zeros(len(v), dtype=bool)
+            match = np.ones(len(v), dtype=bool)
+            for term_id, k in zip(ids, offsets):
+                match &= same_term(k, term_id) if k else corpus.term == term_id
+            return match
+
+        # Checked in VADER's order, the first preceding match wins, following matches override it
+        idiom = np.full(len(v), np.nan)
+        for offsets in ((-1, 0), (-2, -1, 0), (-2, -1), (-3, -2, -1), (-3, -2)):
+            for text, value in SPECIAL_CASE_IDIOMS.items():
+                if len(text.split(" ")) == len(offsets):
+                    idiom = np.where(np.isnan(idiom) & phrase(text.split(" "), offsets), value, idiom)
+        for offsets in ((0, 1), (0, 1, 2)):
+            for text, value in SPECIAL_CASE_IDIOMS.items():
+                if len(text.split(" ")) == len(offsets):
+                    idiom = np.where(phrase(text.split(" "), offsets), value, idiom)
+        v = np.where(active & ~np.isnan(idiom), idiom, v)
+
+        bigram = np.zeros(len(v), dtype=bool)
+        for text in (w for w in BOOSTER_DICT if " " in w):
+            bigram |= phrase(text.split(" "), (-3, -2)) | phrase(text.split(" "), (-2, -1))
+        return np.where(active & bigram, v + B_DECR, v)
+
+    def score_corpus(self, corpus: Corpus) -> np.array:
+        props = self._term_properties(corpus.words)
+        v = self.token_valences(corpus, props)
+
+        # "but": words before it count half, words after it 1.5 times
+        but_pos = np.full(corpus.n_docs, np.iinfo(np.int64).max)
+        is_but = props['but'][corpus.term]
+        np.minimum.at(but_pos, corpus.doc[is_but], corpus.pos[is_but])
+        bi = but_pos[corpus.doc]
+        has_but = bi != np.iinfo(np.int64).max
+        v = np.where(has_but & (corpus.pos < bi), v * 0.5, np.where(has_but & (corpus.pos > bi), v * 1.5, v))
+
+        # Summed in extended precision: Python's sum() (3.12+) is compensated, and a
+        # residue like 2e-16 instead of 0 would flip the sign of the punctuation emphasis
+        total = np.zeros(corpus.n_docs)
+        nonempty = corpus.lengths > 0
+        if nonempty.any():
+            total[nonempty] = np.add.reduceat(v.astype(np.longdouble), corpus.starts[nonempty]).astype(float)
+        amplifier = np.minimum(corpus.exclamations, 4) * 0.292
+        amplifier += np.where(corpus.questions > 3, 0.96, np.where(corpus.questions > 1, corpus.questions * 0.18, 0.0))
+        total = np.where(total > 0, total + amplifier, np.where(total < 0, total - amplifier, total))
+        compound = np.round(total / np.sqrt(total * total + 15), 4)
+        return np.where(corpus.lengths > 0, compound, 0.0)
+
+    def score(self, texts) -> np.array:
+        """Compound score of every text."""
+        return self.score_corpus(Corpus(texts))
@@ -0,0 +1,223 @@
+import asyncio
+import calendar
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import yfinance as yf
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ('utm_', 'guccounter', 'guce_', 'ncid', 'soc_src', 'soc_trk', 'cmpid', 'fbclid', 'gclid', '.tsrc', 'yptr')
+
+
+def canonical_url(url: str) -> str:
+    """The URL without scheme, www., fragment, trailing slash and tracking parameters, for deduplication."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix('www.')
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith(TRACKING_PARAMS)))
+    return urlunsplit(('', host, parts.path.rstrip('/'), query, ''))
+
+
+def _epoch(value):
+    # ISO 8601 string or datetime -> seconds since the epoch, None if unknown
+    try:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value.timestamp() if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def article_key(article: dict) -> str:
+    link = article.get('link') or '#'
+    return canonical_url(link) if link != '#' else 'title:' + article['title'].strip().lower()
+
+
+def dedupe(articles, seen: set = None):
+    """Articles whose canonical URL (or title, without a link) isn't in `seen` yet, which is updated."""
+    seen = set() if seen is None else seen
+    unique = []
+    for article in articles:
+        key = article_key(article)
+        if key not in seen:
+            seen.add(key)
+            unique.append(article)
+    return unique
+
+
+# ---------------- Sources ----------------
+class NewsSource:
+    """
+    A blocking news fetch, run on a worker thread by NewsAggregator.
+    fetch(ticker) returns dicts with title, summary, link, source and
+    published (seconds since the epoch, None if the source doesn't say).
+    """
+    name = "news"
+    timeout = 10.0 # seconds
+
+    def fetch(self, ticker):
+        raise NotImplementedError
+
+
+class YahooNewsSource(NewsSource):
+    name = "Yahoo Finance"
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+
+    def fetch(self, ticker):
+        articles = []
+        for item in yf.Ticker(ticker).news or []:
+            content = item.get('content', {})
+            articles.append({
+                'title': content.get('title', 'No Title'),
+                'summary': content.get('summary', ''),
+                'link': (content.get('canonicalUrl') or {}).get('url', '#'),
+                'source': (content.get('provider') or {}).get('displayName', 'Yahoo Finance'),
+                'published': _epoch(content.get('pubDate'))
+            })
+        return articles
+
+
+class RSSNewsSource(NewsSource):
+    """An RSS/Atom feed, url may contain {ticker}."""
+
+    def __init__(self, name: str, url: str, timeout: float = 5.0):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self, ticker):
+        import feedparser
+        # feedparser can't time out on its own, so the feed is downloaded here
+        request = urllib.request.Request(self.url.format(ticker=ticker), headers={'User-Agent': 'Mozilla/5.0'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            feed = feedparser.parse(response.read())
+        if feed.bozo and not feed.entries:
+            raise ValueError(f"Unreadable feed: {feed.bozo_exception}")
+        return [{
+            'title': entry.get('title', 'No Title'),
+            'summary': entry.get('summary', ''),
+            'link': entry.get('link', '#'),
+            'source': (entry.get('source') or {}).get('title', self.name),
+            'published': calendar.timegm(entry.published_parsed) if entry.get('published_parsed') else None
+        } for entry in feed.entries]
+
+
+class TwitterNewsSource(NewsSource):
+    """Recent tweets mentioning the ticker through the Twitter v2 API (needs a paid tier)."""
+    name = "Twitter"
+
+    def __init__(self, bearer_token: str, timeout: float = 10.0):
+        self.bearer_token = bearer_token
+        self.timeout = timeout
+
+    def fetch(self, ticker):
+        import tweepy
+        client = tweepy.Client(bearer_token=self.bearer_token)
+        # Plain ticker, no $ or operators
+        tweets = client.search_recent_tweets(query=f"{ticker.strip().lstrip('$')} -is:retweet", tweet_fields=['created_at'])
+        return [{
+            'title': t.text[:50] + "...",
+            'summary': t.text,
+            'link': f"https://twitter.com/i/web/status/{t.id}",
+            'source': 'Twitter',
+            'published': _epoch(t.created_at)
+        } for t in tweets.data or []]
+
+
+# ---------------- Circuit Breaker ----------------
+class CircuitBreaker:
+    """
+    Stops calling a source after `max_failures` failures (or timeouts) in a
+    row. After `reset_after` seconds one trial call is let through, which
+    closes the circuit again if it succeeds.
+    """
+
+    def __init__(self, max_failures: int = 3, reset_after: float = 300.0):
+        self.max_failures = max_failures
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None # time.monotonic() when the circuit opened
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                self.opened_at = time.monotonic() # one trial call, others wait for its result
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                self.opened_at = time.monotonic()
+
+
+# ---------------- Aggregator ----------------
+class NewsAggregator:
+    """
+    Queries every source concurrently, shared by every session.
+
+    Each fetch runs on a worker thread with the source's own timeout and
+    circuit breaker, so a slow or failing source never holds up the others.
+    Results are kept per (source, ticker) for `ttl` seconds. stream() yields
+    (source name, new articles, error) as each source finishes, with articles
+    already seen from another source removed by canonical URL.
+    """
+
+    def __init__(self, sources, ttl: float = 300.0, max_workers: int = 8):
+        self.sources = list(sources)
+        self.ttl = ttl
+        self.breakers = {source.name: CircuitBreaker() for source in self.sources}
+        self._results = {} # (source name, ticker) -> (time.monotonic(), articles)
+        self._lock = threading.Lock()
+        # Not the loop's default executor: asyncio.run() would wait for a hung fetch on exit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='news')
+
+    async def _fetch(self, source, ticker):
+        key = (source.name, ticker)
+        with self._lock:
+            cached = self._results.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return source, cached[1], None
+
+        breaker = self.breakers[source.name]
+        if not breaker.allow():
+            # Serve the last results while the source is skipped
+            return source, cached[1] if cached else [], "skipped after repeated failures"
+        loop = asyncio.get_running_loop()
+        try:
+            articles = await asyncio.wait_for(loop.run_in_executor(self._executor, source.fetch, ticker), source.timeout)
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            return source, cached[1] if cached else [], f"timed out after {source.timeout:g}s"
+        except Exception as e:
+            breaker.record_failure()
+            return source, cached[1] if cached else [], str(e)
+        breaker.record_success()
+        with self._lock:
+            self._results[key] = (time.monotonic(), articles)
+        return source, articles, None
+
+    async def stream(self, ticker):
+        seen = set()
+        for next_done in asyncio.as_completed([self._fetch(source, ticker) for source in self.sources]):
+            source, articles, error = await next_done
+            yield source.name, dedupe(articles, seen), error
+
+    def fetch_all(self, ticker):
+        """Every source's articles merged and deduplicated, blocking until all finished or timed out."""
+        async def collect():
+            return [article async for _, articles, _ in self.stream(ticker) for article in articles]
+        return asyncio.run(collect())
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+import pandas as pd
+from news_sources import article_key
+
+
+class NewsStore:
+    """
+    Scored articles per ticker in a local SQLite file, kept across restarts.
+
+    Each article is stored once per ticker (by canonical URL) with its score
+    and publish time, or the time it was first seen if the source has none.
+    A per-ticker daily table (article count and score sum) is updated in the
+    same transaction as the inserts, so rolling sentiment over any span is
+    read from an index instead of rescoring or rescanning articles.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                ticker TEXT NOT NULL, key TEXT NOT NULL, published REAL NOT NULL, title TEXT, summary TEXT,
+                link TEXT, source TEXT, score REAL NOT NULL, PRIMARY KEY (ticker, key));
+            CREATE INDEX IF NOT EXISTS articles_by_time ON articles (ticker, published);
+            CREATE TABLE IF NOT EXISTS daily (
+                ticker TEXT NOT NULL, day TEXT NOT NULL, articles INTEGER NOT NULL, total REAL NOT NULL,
+                PRIMARY KEY (ticker, day));
+        """)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def add(self, ticker: str, articles, scores) -> int:
+        """Stores the articles not stored yet with their scores, returns how many were new."""
+        now = time.time()
+        days = defaultdict(lambda: [0, 0.0])
+        added = 0
+        with self._lock:
+            for article, score in zip(articles, scores):
+                published = article.get('published') or now
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (ticker, article_key(article), published, article.get('title'), article.get('summary'),
+                     article.get('link'), article.get('source'), score)
+                ).rowcount
+                if inserted:
+                    day = days[time.strftime("%Y-%m-%d", time.gmtime(published))]
+                    day[0] += 1
+                    day[1] += score
+                    added += 1
+            # Only new articles are added to the daily sums, the rest were counted when first stored
+            self._conn.executemany(
+                "INSERT INTO daily VALUES (?, ?, ?, ?) ON CONFLICT (ticker, day) "
+                "DO UPDATE SET articles = articles + excluded.articles, total = total + excluded.total",
+                [(ticker, day, n, total) for day, (n, total) in days.items()]
+            )
+            self._conn.commit()
+        return added
+
+    def count(self, ticker: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles WHERE ticker = ?", (ticker,)).fetchone()[0]
+
+    def articles(self, ticker: str, start=None) -> pd.DataFrame:
+        """Stored articles of `ticker` published from `start` on, newest first."""
+        start = pd.Timestamp(start).timestamp() if start is not None else 0.0 # naive times are UTC
+        with self._lock:
+            frame = pd.read_sql_query(
+                "SELECT published, title, summary, link, source, score FROM articles "
+                "WHERE ticker = ? AND published >= ? ORDER BY published DESC", self._conn, params=(ticker, start)
+            )
+        frame['published'] = pd.to_datetime(frame['published'], unit='s')
+        return frame
+
+    def daily(self, ticker: str, start=None) -> pd.DataFrame:
+        """Article count and mean score per UTC day, indexed by date."""
+        start = pd.Timestamp(start).strftime("%Y-%m-%d") if start is not None else ""
+        with self._lock:
+            frame = pd.read_sql_query(
+                "SELECT day, articles, total FROM daily WHERE ticker = ? AND day >= ? ORDER BY day",
+                self._conn, params=(ticker, start)
+            )
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop('day')), name='Date')
+        frame['mean'] = frame['total'] / frame['articles']
+        return frame
+
+    def rolling(self, ticker: str, window: str = "7D", start=None) -> pd.DataFrame:
+        """
+        Rolling sentiment: the mean score of every article in the `window`
+        (a pandas offset like "7D") ending on each day with articles, and
+        how many articles that is.
+        """
+        daily = self.daily(ticker, None if start is None else pd.Timestamp(start) - pd.Timedelta(window))
+        sums = daily[['articles', 'total']].rolling(window).sum()
+        frame = pd.DataFrame({'articles': sums['articles'].astype(int), 'score': sums['total'] / sums['articles']})
+        return frame if start is None else frame[frame.index >= pd.Timestamp(start)]
@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class PriceCube:
+    """
+    Aligned ticker x date x field price matrix backed by a memory-mapped .npy file.
+
+    The array is stored as (ticker, field, date) so every single series is
+    contiguous and `series` hands back a zero-copy view that can go straight
+    into the pattern and trendline functions. An index.json next to it holds
+    the tickers, fields, dates and the first/last valid bar of each ticker.
+    Missing bars are NaN.
+    """
+
+    def __init__(self, root: str, mode: str = 'r'):
+        self.root = root
+        with open(os.path.join(root, "index.json")) as f:
+            index = json.load(f)
+        self.tickers = index['tickers']
+        self.fields = index['fields']
+        self.dates = pd.DatetimeIndex(index['dates'])
+        self.spans = {t: tuple(span) for t, span in zip(self.tickers, index['spans'])}
+        self._ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+        self._field_pos = {f: i for i, f in enumerate(self.fields)}
+        self.values = np.load(os.path.join(root, "cube.npy"), mmap_mode=mode)
+
+    @classmethod
+    def build(cls, root: str, tickers, load, fields=FIELDS, dtype=np.float64):
+        """
+        Writes a cube for `tickers`, calling load(ticker) -> OHLCV DataFrame.
+
+        Each frame is loaded once. Its `fields` (NaN where a field is
+        missing) and dates are spilled to a temporary .npy pair while the
+        union of dates is collected, then read back one ticker at a time into
+        the memory map, so memory use stays at about one ticker.
+        """
+        os.makedirs(root, exist_ok=True)
+        tickers = list(tickers)
+        fields = list(fields)
+
+        with tempfile.TemporaryDirectory(dir=root) as spill:
+            dates = pd.DatetimeIndex([])
+            for i, t in enumerate(tickers):
+                frame = load(t)
+                block = np.full((len(fields), len(frame)), np.nan, dtype=dtype)
+                for j, f in enumerate(fields):
+                    if f in frame:
+                        block[j] = frame[f].to_numpy(dtype=dtype)
+                np.save(os.path.join(spill, f"{i}.npy"), block)
+                np.save(os.path.join(spill, f"{i}-dates.npy"), frame.index.asi8)
+                dates = dates.union(frame.index)
+                del frame, block
+
+            path = os.path.join(root, "cube.npy")
+            values = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(len(tickers), len(fields), len(dates)))
+            spans = []
+            for i in range(len(tickers)):
+                block = np.load(os.path.join(spill, f"{i}.npy"))
+                positions = np.searchsorted(dates.asi8, np.load(os.path.join(spill, f"{i}-dates.npy")))
+                values[i] = np.nan
+                values[i][:, positions] = block
+
+                # First and last bar with data, used to trim leading/trailing NaNs
+                valid = positions[~np.isnan(block).all(axis=0)]
+                spans.append([int(valid.min()), int(valid.max()) + 1] if len(valid) else [0, 0])
+        values.flush()
+        del values
+
+        index = {
+            'tickers': tickers,
+            'fields': fields,
+            'dates': [d.isoformat() for d in dates],
+            'spans': spans,
+        }
+        with open(os.path.join(root, "index.json"), "w") as f:
+            json.dump(index, f)
+        return cls(root)
+
+    def series(self, ticker: str, field: str = 'Close') -> np.array:
+        """Zero-copy view of one field, trimmed to the ticker's own date range."""
+        start, stop = self.spans[ticker]
+        return self.values[self._ticker_pos[ticker], self._field_pos[field], start:stop]
+
+    def index(self, ticker: str) -> pd.DatetimeIndex:
+        """Dates matching `series(ticker, ...)`."""
+        start, stop = self.spans[ticker]
+        return self.dates[start:stop]
+
+    def frame(self, ticker: str) -> pd.DataFrame:
+        """DataFrame over the ticker's fields for the tab functions, backed by the memory map."""
+        start, stop = self.spans[ticker]
+        block = self.values[self._ticker_pos[ticker], :, start:stop]
+        return pd.DataFrame(block.T, index=self.index(ticker), columns=self.fields, copy=False)
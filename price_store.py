@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import threading
+import time
+import pandas as pd
+from data_provider import DataProvider
+
+
+def period_window(period: str, now: pd.Timestamp):
+    """
+    Maps a yfinance style period to the date range it covers.
+
+    Returns:
+        tuple: (start, n_rows). start is the first date to include, or None for
+        all history. n_rows limits day periods to that many trading bars, since
+        "4d" means the last 4 sessions rather than 4 calendar days.
+    """
+    if period == "max":
+        return None, None
+    if period == "ytd":
+        return pd.Timestamp(now.year, 1, 1), None
+
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if match is None:
+        raise ValueError(f"Unsupported period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        # Pad with calendar days so weekends and holidays still leave n sessions
+        return now - pd.Timedelta(days=2 * n + 7), n
+    if unit == "wk":
+        return now - pd.DateOffset(weeks=n), None
+    if unit == "mo":
+        return now - pd.DateOffset(months=n), None
+    return now - pd.DateOffset(years=n), None
+
+
+class PriceStore:
+    """
+    On-disk OHLCV cache with one Parquet file per ticker.
+
+    Each ticker also has a small JSON file that records how far back the
+    stored history is complete and when the latest bars were last fetched.
+    A request only downloads the missing head (older than what is stored) and
+    the tail since the last stored bar, and a period that is already covered
+    and fresh is served without any network call.
+    """
+
+    def __init__(self, root: str, provider: DataProvider, refresh_after: float = 3600.0):
+        self.root = root
+        self.provider = provider
+        self.refresh_after = refresh_after # Seconds before the latest bars are refetched
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ticker, ext):
+        name = re.sub(r"[^A-Za-z0-9._^=-]", "_", ticker.upper())
+        return os.path.join(self.root, f"{name}.{ext}")
+
+    def _load(self, ticker):
+        data = pd.DataFrame()
+        meta = {'covered_from': None, 'fetched_at': 0.0}
+        if os.path.exists(self._path(ticker, "parquet")):
+            data = pd.read_parquet(self._path(ticker, "parquet"))
+        if os.path.exists(self._path(ticker, "json")):
+            with open(self._path(ticker, "json")) as f:
+                meta.update(json.load(f))
+        return data, meta
+
+    def _save(self, ticker, data, meta):
+        # Write to a temp file first so readers never see a partial file
+        path = self._path(ticker, "parquet")
+        data.to_parquet(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        with open(self._path(ticker, "json") + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(self._path(ticker, "json") + ".tmp", self._path(ticker, "json"))
+
+    def _fetch(self, ticker, start=None, end=None):
+        return self.provider.download(ticker, period="max" if start is None else None, start=start, end=end)
+
+    @staticmethod
+    def _merge(data, new):
+        if new is None or new.empty:
+            return data
+        if data.empty:
+            return new.sort_index()
+        # Newer fetches win, the last stored bar may have been a partial session
+        merged = pd.concat([data, new])
+        return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+    def get(self, ticker: str, period: str) -> pd.DataFrame:
+        """Returns OHLCV data for `ticker` over `period`, fetching only the missing bars."""
+        now = pd.Timestamp.now().normalize()
+        start, n_rows = period_window(period, now)
+
+        with self._lock:
+            data, meta = self._load(ticker)
+            changed = False
+
+            # Missing head: nothing stored yet, or the period reaches further back
+            covered_from = meta['covered_from']
+            if covered_from is None or (covered_from != "max" and (start is None or start < pd.Timestamp(covered_from))):
+                end = None if data.empty else data.index[0]
+                data = self._merge(data, self._fetch(ticker, start=start, end=end))
+                meta['covered_from'] = "max" if start is None else start.isoformat()
+                if end is None:
+                    meta['fetched_at'] = time.time()
+                changed = True
+
+            # Missing tail: refetch from the last stored bar once the data is stale
+            if not data.empty and time.time() - meta['fetched_at'] >= self.refresh_after:
+                try:
+                    data = self._merge(data, self._fetch(ticker, start=data.index[-1]))
+                    meta['fetched_at'] = time.time()
+                    changed = True
+                except Exception as e:
+                    print(f"Error refreshing {ticker}, serving stored data: {e}")
+
+            if changed and not data.empty:
+                self._save(ticker, data, meta)
+
+        if data.empty:
+            return data
+        if start is not None:
+            data = data[data.index >= start]
+        if n_rows is not None:
+            data = data.tail(n_rows)
+        return data.copy()
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from collections import deque
 
 # Checks if there is a local top detected at curr index
 def rw_top(data: np.array, curr_index: int, order: int) -> bool:
@@ -32,27 +33,109 @@ def rw_bottom(data: np.array, curr_index: int, order: int) -> bool:
     
     return bottom
 
+# Sliding window maximum over every full window of length `window`.
+# Uses the van Herk/Gil-Werman block trick so the cost is O(n) regardless
+# of the window length. out[s] = max(data[s:s + window])
+def _rolling_max(data: np.array, window: int) -> np.array:
+    n = len(data)
+    n_blocks = -(-n // window)
+    padded = np.full(n_blocks * window, -np.inf)
+    padded[:n] = data
+    blocks = padded.reshape(n_blocks, window)
+
+    # Running max from the left and from the right inside each block
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    # A window starting at s spans the tail of one block and the head of the next
+    starts = np.arange(n - window + 1)
+    return np.maximum(suffix[starts], prefix[starts + window - 1])
+
+# Vectorized equivalent of calling rw_top/rw_bottom for every index.
+# is_top[i] is True exactly when rw_top(data, i, order) would be True,
+# so the flags stay causal: bar i only looks at data[i - 2 * order:i + 1].
+def rw_extreme_flags(data: np.array, order: int):
+    data = np.asarray(data, dtype=float)
+    n = len(data)
+    window = order * 2 + 1
+    is_top = np.zeros(n, dtype=bool)
+    is_bottom = np.zeros(n, dtype=bool)
+    if n < window + 1:
+        return is_top, is_bottom
+
+    win_max = _rolling_max(data, window)
+    win_min = -_rolling_max(-data, window)
+
+    # Window starting at s is confirmed at i = s + 2 * order with its centre at i - order.
+    # rw_top/rw_bottom skip the first full window (curr_index < order * 2 + 1).
+    centre = data[order:n - order]
+    is_top[window - 1:] = centre >= win_max
+    is_bottom[window - 1:] = centre <= win_min
+    is_top[window - 1] = False
+    is_bottom[window - 1] = False
+    return is_top, is_bottom
+
 def rw_extremes(data: np.array, order:int):
     # Rolling window local tops and bottoms
-    tops = []
-    bottoms = []
-    for i in range(len(data)):
-        if rw_top(data, i, order):
-            # top[0] = confirmation index
-            # top[1] = index of top
-            # top[2] = price of top
-            top = [i, i - order, data[i - order]]
-            tops.append(top)
-        
-        if rw_bottom(data, i, order):
-            # bottom[0] = confirmation index
-            # bottom[1] = index of bottom
-            # bottom[2] = price of bottom
-            bottom = [i, i - order, data[i - order]]
-            bottoms.append(bottom)
-    
+    is_top, is_bottom = rw_extreme_flags(data, order)
+
+    # top[0] = confirmation index
+    # top[1] = index of top
+    # top[2] = price of top
+    tops = [[i, i - order, data[i - order]] for i in np.flatnonzero(is_top).tolist()]
+
+    # bottom[0] = confirmation index
+    # bottom[1] = index of bottom
+    # bottom[2] = price of bottom
+    bottoms = [[i, i - order, data[i - order]] for i in np.flatnonzero(is_bottom).tolist()]
+
     return tops, bottoms
 
+# Streaming version of rw_top/rw_bottom for live feeds.
+# Keeps only the last 2 * order + 1 prices in a ring buffer plus two monotonic
+# deques, so each push is O(1) amortized and the history is never rescanned.
+class RollingExtremaDetector:
+    def __init__(self, order: int):
+        assert(order >= 1)
+        self.order = order
+        self.window = order * 2 + 1
+        self.buffer = np.zeros(self.window) # ring buffer of recent prices
+        self.index = -1 # index of the latest pushed bar
+        self._max_q = deque() # (index, price), prices non-increasing
+        self._min_q = deque() # (index, price), prices non-decreasing
+
+    def push(self, price: float):
+        # Add the next bar and return (top, bottom).
+        # Each is None or [confirmation index, index of extreme, price],
+        # matching the entries returned by rw_extremes.
+        self.index += 1
+        i = self.index
+        self.buffer[i % self.window] = price
+
+        # Keep equal prices so ties resolve like rw_top/rw_bottom (non-strict)
+        while self._max_q and self._max_q[-1][1] < price:
+            self._max_q.pop()
+        self._max_q.append((i, price))
+        while self._min_q and self._min_q[-1][1] > price:
+            self._min_q.pop()
+        self._min_q.append((i, price))
+
+        # Drop bars that fell out of the window
+        oldest = i - self.window + 1
+        if self._max_q[0][0] < oldest:
+            self._max_q.popleft()
+        if self._min_q[0][0] < oldest:
+            self._min_q.popleft()
+
+        if i < self.window:
+            return None, None
+
+        k = i - self.order
+        v = self.buffer[k % self.window]
+        top = [i, k, v] if v >= self._max_q[0][1] else None
+        bottom = [i, k, v] if v <= self._min_q[0][1] else None
+        return top, bottom
+
 
 
 if __name__ == "__main__":
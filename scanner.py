@@ -0,0 +1,99 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from tab4 import find_hs_patterns_batch, find_flags_pennants_trendline
+
+# Shared price block, attached once per worker process
+_shm = None
+_prices = None
+
+
+def _attach(name: str, size: int):
+    global _shm, _prices
+    _shm = shared_memory.SharedMemory(name=name)
+    _prices = np.ndarray((size,), dtype=np.float64, buffer=_shm.buf)
+
+
+def _scan_ticker(task):
+    ticker, offset, length, hs_order, flag_order = task
+    start = time.perf_counter()
+    data = _prices[offset:offset + length] # view into shared memory, nothing is pickled
+    rows = []
+
+    # Pattern tables are columnar, rows are built from whole columns
+    hs_patterns, ihs_patterns = find_hs_patterns_batch(data, hs_order)
+    for kind, patterns in (('HS', hs_patterns), ('IHS', ihs_patterns)):
+        rows.extend((ticker, kind, *row) for row in zip(patterns.start_i.tolist(), patterns.break_i.tolist(),
+                                                         patterns.pattern_r2.tolist(), patterns.head_height.tolist()))
+
+    bull_flags, bear_flags, bull_pennants, bear_pennants = find_flags_pennants_trendline(data, flag_order)
+    for kind, patterns in (('Bull Flag', bull_flags), ('Bear Flag', bear_flags),
+                           ('Bull Pennant', bull_pennants), ('Bear Pennant', bear_pennants)):
+        rows.extend((ticker, kind, base_x, conf_x, np.nan, height) for base_x, conf_x, height in
+                    zip(patterns.base_x.tolist(), patterns.conf_x.tolist(), patterns.pole_height.tolist()))
+
+    return ticker, length, rows, time.perf_counter() - start
+
+
+def scan_universe(prices, max_workers: int = None, hs_order: int = 5, flag_order: int = 10):
+    """
+    Runs the H&S and flag/pennant detectors over many tickers in a process pool.
+
+    Args:
+        prices (dict): ticker -> 1d array of closes (e.g. PriceCube.series views).
+        max_workers (int): Worker processes, defaults to the CPU count.
+
+    Returns:
+        tuple: (events, timings). events has one row per detected pattern,
+        most recent confirmation first then best fit (R² for H&S).
+        timings has the bars, events and seconds spent per ticker.
+    """
+    tickers = list(prices)
+    lengths = [len(prices[t]) for t in tickers]
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(int) if tickers else []
+    total = int(sum(lengths))
+
+    # Pack every series into one shared block, workers read views of it
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * 8)
+    block = None
+    try:
+        block = np.ndarray((total,), dtype=np.float64, buffer=shm.buf)
+        for t, offset, length in zip(tickers, offsets, lengths):
+            block[offset:offset + length] = prices[t]
+
+        tasks = [(t, int(o), n, hs_order, flag_order) for t, o, n in zip(tickers, offsets, lengths)]
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (4 * workers)) # a few chunks per worker to balance load
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shm.name, total)) as pool:
+            results = list(pool.map(_scan_ticker, tasks, chunksize=chunksize))
+    finally:
+        del block # close() fails while a view of the buffer is alive
+        shm.close()
+        shm.unlink()
+
+    rows = [row for _, _, ticker_rows, _ in results for row in ticker_rows]
+    events = pd.DataFrame(rows, columns=['ticker', 'pattern', 'start_i', 'conf_i', 'r2', 'height'])
+    bars = dict(zip(tickers, lengths))
+    events['bars_ago'] = [bars[t] - 1 - i for t, i in zip(events['ticker'], events['conf_i'])]
+    events = events.sort_values(['bars_ago', 'r2'], ascending=[True, False], na_position='last').reset_index(drop=True)
+
+    timings = pd.DataFrame(
+        [(t, n, len(r), s) for t, n, r, s in results],
+        columns=['ticker', 'bars', 'events', 'seconds']
+    )
+    return events, timings
+
+
+if __name__ == "__main__":
+    import sys
+    from price_cube import PriceCube
+
+    cube = PriceCube(sys.argv[1])
+    start = time.perf_counter()
+    events, timings = scan_universe({t: cube.series(t, 'Close') for t in cube.tickers})
+    print(events.head(50).to_string())
+    print(timings.describe().to_string())
+    print(f"Scanned {len(cube.tickers)} tickers in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Part of every cache key, change it when the scoring changes
+SCORER = "finvader-sentibignomics-henry-compound-v1"
+
+
+# ---------------- Scoring ----------------
+_analyzer = None
+
+
+def _get_analyzer():
+    # finvader(text, use_sentibignomics=True, use_henry=True) builds this same
+    # analyzer on every call. Here it's built once per process.
+    global _analyzer
+    if _analyzer is None:
+        from finvader import lexicon1, lexicon2
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        sentibignomics = {word: value * 0.1 for word, value in lexicon1().items()}
+        analyzer = SentimentIntensityAnalyzer()
+        analyzer.lexicon.update({**sentibignomics, **lexicon2()})
+        _analyzer = analyzer
+    return _analyzer
+
+
+def _score_chunk(texts):
+    analyzer = _get_analyzer()
+    return [analyzer.polarity_scores(text)['compound'] for text in texts]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(f"{SCORER}\x1f{text}".encode(), digest_size=16).hexdigest()
+
+
+# ---------------- Cache ----------------
+class ScoreCache:
+    """
+    Scores by text hash in a local SQLite file, shared by every ticker and
+    session, so a headline is only scored once even across restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS scores (hash TEXT PRIMARY KEY, score REAL NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, hashes) -> dict:
+        hashes = list(hashes)
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500): # stay below SQLite's variable limit
+                chunk = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT hash, score FROM scores WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update(rows)
+        return found
+
+    def put_many(self, scores: dict):
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?)", scores.items())
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+
+# ---------------- Batch API ----------------
+def score_texts(texts, cache: ScoreCache = None, max_workers: int = 1, chunk_size: int = 2000):
+    """
+    FinVADER compound scores for a list of texts, in the same order.
+
+    Identical texts are scored once, and texts already in `cache` are not
+    scored again. New scores are added to the cache. With max_workers > 1,
+    batches of more than chunk_size new texts are split across a process
+    pool (each worker builds its analyzer once).
+    """
+    hashes = [text_hash(text) for text in texts]
+    unique = dict(zip(hashes, texts))
+
+    scores = cache.get_many(unique) if cache is not None else {}
+    missing = [h for h in unique if h not in scores]
+    if missing:
+        todo = [unique[h] for h in missing]
+        if max_workers > 1 and len(todo) > chunk_size:
+            chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                new = [score for chunk in pool.map(_score_chunk, chunks) for score in chunk]
+        else:
+            new = _score_chunk(todo)
+        new = dict(zip(missing, new))
+        if cache is not None:
+            cache.put_many(new)
+        scores.update(new)
+    return [scores[h] for h in hashes]
@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from indicators import fingerprint
+
+
+class StageCache:
+    """
+    Cache of analysis stages, shared by every session.
+
+    A stage is a named computation run through run(). Its key is built from
+    the stage name, its params and a key per input: the stage key when the
+    input is the output of another cached stage, otherwise a content hash.
+    So a stage only executes again when something it actually reads changed,
+    and everything downstream of an unchanged stage is a hit. Hits, misses
+    and compute time are counted per stage, and each script run gets its
+    own log (runs are per thread in Streamlit) for the debug overlay.
+
+    A run can also pass a per-session dict to begin_run(). Results the
+    session used are kept there as well, so a tab opened once stays cached
+    for that session even if the shared cache evicts it.
+    """
+
+    def __init__(self, max_entries: int = 128, session_entries: int = 64):
+        self.max_entries = max_entries
+        self.session_entries = session_entries
+        self._entries = OrderedDict() # key -> (stage, value)
+        self._output_keys = {} # id(value) -> key, for values held in _entries
+        self._stats = {} # stage -> [hits, misses, seconds]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _input_key(self, value) -> str:
+        key = self._output_keys.get(id(value))
+        if key is not None and self._entries.get(key, (None, None))[1] is value:
+            return key
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return fingerprint(value) if isinstance(value, pd.DataFrame) else fingerprint(value.to_frame())
+        if isinstance(value, (np.ndarray, np.generic)):
+            data = np.ascontiguousarray(value)
+            if data.dtype.hasobject: # the buffer holds pointers, not the values
+                raise TypeError(f"Can't key a stage input of dtype {data.dtype}, convert it to a list or DataFrame")
+            return f"{data.dtype}{data.shape}-{hashlib.blake2b(data.data, digest_size=8).hexdigest()}"
+        # Exact reprs only, a default repr has an id and a long one can be truncated
+        if value is None or isinstance(value, (bool, int, float, str, bytes, range)):
+            return repr(value)
+        if isinstance(value, (tuple, list)):
+            return f"{type(value).__name__}(" + "\x1f".join(self._input_key(v) for v in value) + ")"
+        if isinstance(value, dict):
+            items = sorted((self._input_key(k), self._input_key(v)) for k, v in value.items())
+            return "dict(" + "\x1f".join(f"{k}:{v}" for k, v in items) + ")"
+        raise TypeError(f"Can't key a stage input of type {type(value).__name__}")
+
+    def key(self, name: str, inputs: tuple, params: dict) -> str:
+        parts = [name] + [self._input_key(v) for v in inputs] + [f"{k}={self._input_key(v)}" for k, v in sorted(params.items())]
+        return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest()
+
+    def run(self, name: str, compute, *inputs, **params):
+        """Returns compute(*inputs, **params), reusing the stored result when no input or param changed."""
+        key = self.key(name, inputs, params)
+        session = getattr(self._local, 'session', None)
+        with self._lock:
+            stats = self._stats.setdefault(name, [0, 0, 0.0])
+            if session is not None and key in session:
+                session.move_to_end(key)
+                stats[0] += 1
+                self._log(name, 'session', 0.0)
+                return session[key]
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                stats[0] += 1
+                self._log(name, 'hit', 0.0)
+                return self._remember(session, key, self._entries[key][1])
+
+        start = time.perf_counter()
+        value = compute(*inputs, **params)
+        seconds = time.perf_counter() - start
+
+        with self._lock:
+            self._entries[key] = (name, value)
+            self._entries.move_to_end(key)
+            if not isinstance(value, (str, bytes, int, float, type(None))): # interned values share ids
+                self._output_keys[id(value)] = key
+            while len(self._entries) > self.max_entries:
+                old_key, (_, old_value) = self._entries.popitem(last=False)
+                if self._output_keys.get(id(old_value)) == old_key:
+                    del self._output_keys[id(old_value)]
+            stats[1] += 1
+            stats[2] += seconds
+            self._log(name, 'miss', seconds)
+            return self._remember(session, key, value)
+
+    def _remember(self, session, key, value):
+        if session is not None:
+            session[key] = value
+            session.move_to_end(key)
+            while len(session) > self.session_entries:
+                session.popitem(last=False)
+        return value
+
+    # ---------------- Debug ----------------
+    def _log(self, name, result, seconds):
+        log = getattr(self._local, 'log', None)
+        if log is not None:
+            log.append((name, result, seconds))
+
+    def begin_run(self, session: OrderedDict = None):
+        """Starts a new log for the current thread's script run, optionally with the session's results."""
+        self._local.log = []
+        self._local.session = session
+
+    def run_log(self) -> pd.DataFrame:
+        """Stages looked up in the current run, in order."""
+        return pd.DataFrame(getattr(self._local, 'log', None) or [], columns=['stage', 'result', 'seconds'])
+
+    def stats(self) -> pd.DataFrame:
+        """Hits, misses and total compute seconds per stage since startup."""
+        with self._lock:
+            rows = [(name, *counts) for name, counts in self._stats.items()]
+        return pd.DataFrame(rows, columns=['stage', 'hits', 'misses', 'seconds'])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._output_keys.clear()
+
+
+_cache = StageCache()
+run = _cache.run
+begin_run = _cache.begin_run
+run_log = _cache.run_log
+stats = _cache.stats
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from indicators import IncrementalIndicators
+from rolling_window import RollingExtremaDetector
+from tab4 import FlagScanner, HSScanner
+
+
+@dataclass
+class Tick:
+    ticker: str
+    timestamp: pd.Timestamp
+    price: float
+    volume: float = 0.0
+
+
+# ---------------- Sources ----------------
+class TickSource:
+    """Async iterator of Ticks. Subclasses implement __aiter__."""
+
+    def __aiter__(self):
+        raise NotImplementedError
+
+
+class ReplaySource(TickSource):
+    """
+    Replays ticks from a CSV file with ticker, timestamp, price, volume columns.
+    Stand-in for a live feed. speed=0 replays as fast as possible, otherwise
+    the gaps between timestamps are divided by speed.
+    """
+
+    def __init__(self, path: str, speed: float = 0.0):
+        self.path = path
+        self.speed = speed
+
+    async def __aiter__(self):
+        frame = pd.read_csv(self.path, parse_dates=['timestamp'])
+        last_ts = None
+        for row in frame.itertuples(index=False):
+            if self.speed > 0 and last_ts is not None:
+                await asyncio.sleep(max((row.timestamp - last_ts).total_seconds() / self.speed, 0.0))
+            last_ts = row.timestamp
+            yield Tick(row.ticker, row.timestamp, float(row.price), float(getattr(row, 'volume', 0.0)))
+            await asyncio.sleep(0) # let other tasks run between ticks
+
+
+class SocketSource(TickSource):
+    """Reads newline-delimited JSON ticks ({"ticker", "timestamp", "price", "volume"}) from a TCP socket."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+
+    async def __aiter__(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            while line := await reader.readline():
+                yield _parse_tick(line)
+        finally:
+            writer.close()
+
+
+class WebSocketSource(TickSource):
+    """Reads JSON ticks from a websocket. Needs the optional `websockets` package."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def __aiter__(self):
+        import websockets
+        async with websockets.connect(self.url) as ws:
+            async for message in ws:
+                yield _parse_tick(message)
+
+
+def _parse_tick(message) -> Tick:
+    item = json.loads(message)
+    return Tick(item['ticker'], pd.Timestamp(item['timestamp']), float(item['price']), float(item.get('volume', 0.0)))
+
+
+# ---------------- Signals ----------------
+class SignalTracker:
+    """
+    Incremental version of tab2.compare_rsi_and_macd_signals.
+
+    Keeps the crossover flags of the last `grace_period` bars and reports a
+    strong buy when both RSI (out of oversold) and MACD crossed up within
+    them, or a strong sell when both crossed down.
+    """
+
+    def __init__(self, grace_period: int = 10, oversold: float = 30, overbought: float = 70):
+        self.oversold = oversold
+        self.overbought = overbought
+        self.events = deque(maxlen=grace_period) # per bar: (rsi bull, macd bull, rsi bear, macd bear)
+        self.prev = None # indicator values of the previous bar
+        self.last = None # indicator values of the current bar
+
+    def _flags(self, values):
+        if self.prev is None:
+            return (False, False, False, False)
+        p, c = self.prev, values
+        return (
+            p['RSI'] <= self.oversold and c['RSI'] > self.oversold,
+            p['MACD'] <= p['Signal Line'] and c['MACD'] > c['Signal Line'],
+            p['RSI'] >= self.overbought and c['RSI'] < self.overbought,
+            p['MACD'] >= p['Signal Line'] and c['MACD'] < c['Signal Line'],
+        )
+
+    def update(self, values):
+        """Adds a new bar."""
+        if self.last is not None:
+            self.prev = self.last
+        self.last = values
+        self.events.append(self._flags(values))
+        return self.signal()
+
+    def revise(self, values):
+        """Replaces the current bar."""
+        self.last = values
+        self.events[-1] = self._flags(values)
+        return self.signal()
+
+    def signal(self):
+        """Returns 'buy', 'sell' or None."""
+        rsi_bull, macd_bull, rsi_bear, macd_bear = (any(flags) for flags in zip(*self.events)) if self.events else (False,) * 4
+        if rsi_bull and macd_bull:
+            return 'buy'
+        if rsi_bear and macd_bear:
+            return 'sell'
+        return None
+
+
+# ---------------- Consumer ----------------
+class StreamMetrics:
+    """Tick throughput and per-tick update latency."""
+
+    def __init__(self, window: int = 10000):
+        self.ticks = 0
+        self.started = None
+        self.latencies = deque(maxlen=window) # seconds, most recent ticks
+
+    def record(self, latency: float):
+        if self.started is None:
+            self.started = time.perf_counter()
+        self.ticks += 1
+        self.latencies.append(latency)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started if self.started is not None else 0.0
+        lat = np.array(list(self.latencies)) * 1e6 # list() copies at once, the feed thread may be appending
+        return {
+            'ticks': self.ticks,
+            'ticks_per_sec': self.ticks / elapsed if elapsed > 0 else 0.0,
+            'latency_p50_us': float(np.percentile(lat, 50)) if len(lat) else np.nan,
+            'latency_p99_us': float(np.percentile(lat, 99)) if len(lat) else np.nan,
+        }
+
+
+# Pattern tables of HSScanner and FlagScanner
+PATTERN_LABELS = {
+    'hs_patterns': "head & shoulders", 'ihs_patterns': "inverted head & shoulders",
+    'bull_flags': "bull flag", 'bear_flags': "bear flag", 'bull_pennants': "bull pennant", 'bear_pennants': "bear pennant",
+}
+
+
+class _TickerState:
+    def __init__(self, indicators: IncrementalIndicators, hs_order: int, flag_order: int):
+        self.indicators = indicators
+        self.signals = SignalTracker()
+        self.bar = None # start of the current bar
+        self.bar_volume = 0.0
+        self.price = None # latest price of the current bar
+        self.values = None
+        self.signal = None
+
+        # Finished bars, grown by doubling, for the pattern scanners
+        self.closes = np.empty(256)
+        self.bar_starts = []
+        # Pivots (at the flag order) and patterns as tab4 finds them, one bar at a time
+        self.hs_extrema = RollingExtremaDetector(hs_order)
+        self.flag_extrema = RollingExtremaDetector(flag_order)
+        self.hs = HSScanner(hs_order)
+        self.flags = FlagScanner(flag_order)
+        self.last_top = None # (bar, price) of the latest confirmed top
+        self.last_bottom = None
+        self.patterns = deque(maxlen=20) # (confirmation bar, pattern name), oldest first
+
+    def close_bar(self, price: float):
+        # The current bar is final (the next one started), scan it
+        i = len(self.bar_starts)
+        if i == len(self.closes):
+            self.closes = np.concatenate([self.closes, np.empty(i)])
+        self.closes[i] = price
+        self.bar_starts.append(self.bar)
+        data = self.closes[:i + 1]
+
+        top, bottom = self.flag_extrema.push(price)
+        if top is not None:
+            self.last_top = (self.bar_starts[top[1]], top[2])
+        if bottom is not None:
+            self.last_bottom = (self.bar_starts[bottom[1]], bottom[2])
+        found = self.flags.step(data, i, top is not None, bottom is not None)
+
+        top, bottom = self.hs_extrema.push(price)
+        found += self.hs.step(data, i, top is not None, bottom is not None)
+        for name in found:
+            self.patterns.append((self.bar, PATTERN_LABELS[name]))
+
+
+class StreamConsumer:
+    """
+    Reads ticks from a TickSource and keeps per ticker latest price, indicator
+    values and RSI/MACD signal up to date, one O(1) update per tick.
+
+    Ticks are grouped into bars of `bar_freq` ("D" matches the app's daily
+    data). The first tick of a bar adds a new bar, later ticks revise it.
+    When a bar is final it is pushed through RollingExtremaDetectors into
+    tab4's H&S and flag scanners, so pivots and patterns are found as the
+    feed runs without rescanning the history.
+    """
+
+    def __init__(self, bar_freq: str = "D", on_update=None, hs_order: int = 5, flag_order: int = 10):
+        self.bar_freq = bar_freq
+        self.hs_order = hs_order # extrema orders, same as tab4 uses
+        self.flag_order = flag_order
+        self.on_update = on_update # on_update(ticker, state) after every tick
+        self.states = {}
+        self.latest_prices = {}
+        self.metrics = StreamMetrics()
+        self.error = None # exception that stopped run(), the feed thread can't raise it to anyone
+
+    def seed(self, ticker: str, data: pd.DataFrame):
+        """Starts a ticker from history so indicators are warm before the first tick."""
+        state = self._new_state()
+        bars = pd.DatetimeIndex(data.index).floor(self.bar_freq)
+        for bar, close, volume in zip(bars, data['Close'].to_numpy(dtype=float), data['Volume'].to_numpy(dtype=float)):
+            if state.bar is not None:
+                state.close_bar(state.price)
+            state.bar, state.price, state.bar_volume = bar, close, volume
+            state.values = state.indicators.update(close, volume)
+            state.signal = state.signals.update(state.values)
+        if len(data):
+            self.latest_prices[ticker] = state.price
+        self.states[ticker] = state
+
+    def _new_state(self):
+        return _TickerState(IncrementalIndicators(), self.hs_order, self.flag_order)
+
+    def process(self, tick: Tick):
+        start = time.perf_counter()
+        state = self.states.get(tick.ticker)
+        if state is None:
+            state = self.states[tick.ticker] = self._new_state()
+
+        bar = pd.Timestamp(tick.timestamp).floor(self.bar_freq)
+        if bar != state.bar:
+            if state.bar is not None:
+                state.close_bar(state.price)
+            state.bar, state.bar_volume = bar, tick.volume
+            state.values = state.indicators.update(tick.price, state.bar_volume)
+            state.signal = state.signals.update(state.values)
+        else:
+            state.bar_volume += tick.volume
+            state.values = state.indicators.revise(tick.price, state.bar_volume)
+            state.signal = state.signals.revise(state.values)
+
+        state.price = tick.price
+        self.latest_prices[tick.ticker] = tick.price
+        self.metrics.record(time.perf_counter() - start)
+        if self.on_update is not None:
+            self.on_update(tick.ticker, state)
+        return state
+
+    async def run(self, source: TickSource):
+        try:
+            async for tick in source:
+                self.process(tick)
+        except Exception as e:
+            self.error = e
+            raise
+        return self.metrics.report()
+
+    def start_in_thread(self, source: TickSource):
+        """Runs the consumer on its own event loop in a daemon thread (used by the Streamlit app)."""
+        thread = threading.Thread(target=asyncio.run, args=(self.run(source),), daemon=True)
+        thread.start()
+        return thread
+
+
+if __name__ == "__main__":
+    import sys
+
+    consumer = StreamConsumer()
+    report = asyncio.run(consumer.run(ReplaySource(sys.argv[1])))
+    for ticker, state in consumer.states.items():
+        print(ticker, consumer.latest_prices[ticker], state.signal, state.values, list(state.patterns)[-3:])
+    print(report)
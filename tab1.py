@@ -5,143 +5,18 @@ import numpy as np
 import mplfinance as mpf
 import matplotlib.pyplot as plt
 import math
-
-def check_trend_line(support: bool, pivot: int, slope: float, y: np.array):
-    """
-    Computes the squared sum of differences between a line and the price data.
-    
-    Args:
-        support (bool): True for a support line, False for a resistance line.
-        pivot (int): The index of the pivot point the line passes through.
-        slope (float): The slope of the line.
-        y (np.array): The price data.
-
-    Returns:
-        float: The squared sum of differences, or -1.0 if the line is invalid.
-    """
-    # Find the intercept of the line going through pivot point with given slope
-    intercept = -slope * pivot + y[pivot]
-    line_vals = slope * np.arange(len(y)) + intercept
-     
-    diffs = line_vals - y
-    
-    # Check to see if the line is valid, return -1 if it is not valid.
-    # For support, all price points must be above or on the line.
-    # For resistance, all price points must be below or on the line.
-    if support and diffs.max() > 1e-5:
-        return -1.0
-    elif not support and diffs.min() < -1e-5:
-        return -1.0
-
-    # Squared sum of diffs between data and line 
-    err = (diffs ** 2.0).sum()
-    return err
-
-
-def optimize_slope(support: bool, pivot:int , init_slope: float, y: np.array):
-    """
-    Optimizes the slope of a trendline to minimize the squared error while
-    respecting the support/resistance constraints.
-    
-    Args:
-        support (bool): True for a support line, False for a resistance line.
-        pivot (int): The index of the pivot point.
-        init_slope (float): The initial slope to start the optimization.
-        y (np.array): The price data.
-
-    Returns:
-        tuple: A tuple containing the optimized slope and intercept.
-    """
-    # Amount to change slope by. Multiplied by opt_step
-    slope_unit = (y.max() - y.min()) / len(y) 
-    
-    # Optimization variables
-    opt_step = 1.0
-    min_step = 0.0001
-    curr_step = opt_step # current step
-    
-    # Initiate at the slope of the line of best fit
-    best_slope = init_slope
-    best_err = check_trend_line(support, pivot, init_slope, y)
-    assert(best_err >= 0.0) # Shouldn't ever fail with initial slope
-
-    get_derivative = True
-    derivative = None
-    while curr_step > min_step:
-
-        if get_derivative:
-            # Numerical differentiation to determine direction for slope change.
-            slope_change = best_slope + slope_unit * min_step
-            test_err = check_trend_line(support, pivot, slope_change, y)
-            derivative = test_err - best_err
-            
-            # If increasing by a small amount fails, try decreasing
-            if test_err < 0.0:
-                slope_change = best_slope - slope_unit * min_step
-                test_err = check_trend_line(support, pivot, slope_change, y)
-                derivative = best_err - test_err
-
-            if test_err < 0.0: # Derivative failed, give up
-                raise Exception("Derivative failed. Check your data.")
-
-            get_derivative = False
-
-        if derivative > 0.0: # Increasing slope increased error
-            test_slope = best_slope - slope_unit * curr_step
-        else: # Increasing slope decreased error
-            test_slope = best_slope + slope_unit * curr_step
-        
-        test_err = check_trend_line(support, pivot, test_slope, y)
-        if test_err < 0 or test_err >= best_err: 
-            # Slope failed/didn't reduce error
-            curr_step *= 0.5 # Reduce step size
-        else: # Test slope reduced error
-            best_err = test_err 
-            best_slope = test_slope
-            get_derivative = True # Recompute derivative
-    
-    # Optimization is done, return best slope and intercept
-    return (best_slope, -best_slope * pivot + y[pivot])
-
-
-def fit_trendlines_single(data: np.array):
-    """
-    Fits support and resistance trendlines to a single series of data.
-    """
-    # Find line of best fit (least squares)
-    x = np.arange(len(data))
-    coefs = np.polyfit(x, data, 1)
-
-    # Get points of line.
-    line_points = coefs[0] * x + coefs[1]
-
-    # Find upper and lower pivot points
-    upper_pivot = (data - line_points).argmax() 
-    lower_pivot = (data - line_points).argmin() 
-   
-    # Optimize the slope for both trend lines
-    support_coefs = optimize_slope(True, lower_pivot, coefs[0], data)
-    resist_coefs = optimize_slope(False, upper_pivot, coefs[0], data)
-
-    return (support_coefs, resist_coefs) 
-
-
-def fit_trendlines_high_low(high: np.array, low: np.array, close: np.array):
-    """
-    Fits support and resistance trendlines using high, low, and close prices.
-    """
-    x = np.arange(len(close))
-    coefs = np.polyfit(x, close, 1)
-    # coefs[0] = slope,  coefs[1] = intercept
-    line_points = coefs[0] * x + coefs[1]
-    upper_pivot = (high - line_points).argmax() 
-    lower_pivot = (low - line_points).argmin() 
-    
-    support_coefs = optimize_slope(True, lower_pivot, coefs[0], low)
-    resist_coefs = optimize_slope(False, upper_pivot, coefs[0], high)
-
-    return (support_coefs, resist_coefs)
-
+import altair as alt
+import indicators
+import stages
+import charts
+from downsample import downsample
+from backtest import ma_crossover_sweep
+from trendline_automation import fit_trendlines_high_low, rolling_trendlines_high_low
+
+TREND_LOOKBACK = 30 # Default rolling trendline window
+MA_WINDOWS = (5, 20) # Default short and long moving average windows
+SWEEP_SHORT = range(2, 51) # Short windows of the crossover sweep
+SWEEP_LONG = range(10, 201, 5) # Long windows of the crossover sweep
 
 def plot_support_resistance(data: pd.DataFrame):
     """
@@ -152,62 +27,112 @@ def plot_support_resistance(data: pd.DataFrame):
         lookback (int): The number of data points to use for trendline calculation.
     """
     st.subheader("Plotting Trendlines")  
-    candles = data.copy()  # Work on a copy of the data
 
     # Take natural log of data to resolve price scaling issues
-    candles['High'] = np.log(candles['High'])
-    candles['Low'] = np.log(candles['Low'])
-    candles['Close'] = np.log(candles['Close'])
+    log_high = indicators.log_prices(data, 'High')
+    log_low = indicators.log_prices(data, 'Low')
+    log_close = indicators.log_prices(data, 'Close')
 
     # Fit trendlines
-    support_coefs, resist_coefs = fit_trendlines_high_low(
-        candles['High'].values, 
-        candles['Low'].values, 
-        candles['Close'].values
+    support_coefs, resist_coefs = stages.run(
+        'trendlines',
+        fit_trendlines_high_low,
+        log_high.values, 
+        log_low.values, 
+        log_close.values
     )
     
-    # Create the trendline data points
-    x = np.arange(len(candles))
-    support_line = support_coefs[0] * x + support_coefs[1]
-    resist_line = resist_coefs[0] * x + resist_coefs[1]
-
-    # Convert the resistance line array to a Pandas Series for easy shifting
-    resistance_series = pd.Series(resist_line, index=candles.index)
+    # Drawn only when the chart is not cached yet
+    def draw():
+        # Create the trendline data points
+        x = np.arange(len(data))
+        support_line = support_coefs[0] * x + support_coefs[1]
+        resist_line = resist_coefs[0] * x + resist_coefs[1]
+
+        # Convert the resistance line array to a Pandas Series for easy shifting
+        resistance_series = pd.Series(resist_line, index=data.index)
+    
+        # Detect breakouts (when price crosses above resistance line)
+        breakout_signal = np.where(
+            (log_close.shift(1) < resistance_series.shift(1)) & 
+            (log_close >= resistance_series),
+            log_close,  # Mark the breakout point with the closing price
+            np.nan # Use NaN for non-breakout points
+        )
+
+        # Create the plot
+        plt.style.use('dark_background')
+        fig, ax = plt.subplots(figsize=(10, 6))
+    
+        # Plot the log-scaled close price
+        ax.plot(data.index, log_close, label='Log Close Price', color='white', linewidth=2)
+    
+        # Plot the trendlines
+        ax.plot(data.index, support_line, label='Support Trendline', color='green', linestyle='--', linewidth=2)
+        ax.plot(data.index, resist_line, label='Resistance Trendline', color='red', linestyle='--', linewidth=2)
+    
+        # Plot the breakout signals
+        ax.scatter(data.index, breakout_signal, marker='^', color='red', s=200, label='Breakout Signal', zorder=5)
+    
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Log Price')
+        ax.legend()
+        ax.grid(True, which='both', linestyle=':', alpha=0.5)
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+        return fig
+    charts.show_figure(data, 'support_resistance', draw)
+
+def plot_rolling_trendline_slopes(data: pd.DataFrame):
+    """
+    Plots the support and resistance slopes of a trendline fit over a rolling window.
     
-    # Detect breakouts (when price crosses above resistance line)
-    candles['Breakout_Signal'] = np.where(
-        (candles['Close'].shift(1) < resistance_series.shift(1)) & 
-        (candles['Close'] >= resistance_series),
-        candles['Close'],  # Mark the breakout point with the closing price
-        np.nan # Use NaN for non-breakout points
+    Args:
+        data (pd.DataFrame): DataFrame with 'High', 'Low', 'Close' prices.
+    """
+    st.subheader("Rolling Trendline Slopes")
+    st.write("Support and resistance lines are refit on every window of the chosen length. Rising slopes show the trend strengthening, falling slopes show it fading.")
+    lookback = st.number_input("Trendline Lookback Window", min_value=3, value=TREND_LOOKBACK, step=1, key="trend_lookback")
+
+    if len(data) < lookback:
+        st.info("Not enough data for the selected lookback window. A longer `period` is required.")
+        return
+
+    # Take natural log of data to resolve price scaling issues
+    support_slope, _, resist_slope, _ = stages.run(
+        'rolling_trendlines',
+        rolling_trendlines_high_low,
+        indicators.log_prices(data, 'High').values,
+        indicators.log_prices(data, 'Low').values,
+        indicators.log_prices(data, 'Close').values,
+        lookback
     )
 
-    # Create the plot
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # Plot the log-scaled close price
-    ax.plot(candles.index, candles['Close'], label='Log Close Price', color='white', linewidth=2)
-    
-    # Plot the trendlines
-    ax.plot(candles.index, support_line, label='Support Trendline', color='green', linestyle='--', linewidth=2)
-    ax.plot(candles.index, resist_line, label='Resistance Trendline', color='red', linestyle='--', linewidth=2)
-    
-    # Plot the breakout signals
-    ax.scatter(candles.index, candles['Breakout_Signal'], marker='^', color='red', s=200, label='Breakout Signal', zorder=5)
-    
-    ax.set_xlabel('Date')
-    ax.set_ylabel('Log Price')
-    ax.legend()
-    ax.grid(True, which='both', linestyle=':', alpha=0.5)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    st.pyplot(fig)
+    def draw():
+        # Create the plot
+        plt.style.use('dark_background')
+        fig, ax1 = plt.subplots(figsize=(10, 6))
+        ax2 = ax1.twinx()
+
+        ax1.plot(data.index, indicators.log_prices(data, 'Close'), label='Log Close Price', color='white', linewidth=1)
+        ax2.plot(data.index, support_slope, label='Support Slope', color='green', linewidth=1.5)
+        ax2.plot(data.index, resist_slope, label='Resistance Slope', color='red', linewidth=1.5)
+
+        ax1.set_title(f'Trendline Slopes over a {lookback}-bar Window')
+        ax1.set_xlabel('Date')
+        ax1.set_ylabel('Log Price')
+        ax2.set_ylabel('Slope')
+        ax2.legend()
+        ax1.grid(True, which='both', linestyle=':', alpha=0.5)
+        plt.setp(ax1.get_xticklabels(), rotation=45)
+        plt.tight_layout()
+        return fig
+    charts.show_figure(data, 'rolling_trendline_slopes', draw, lookback)
 
 def plot_basic_trend(data):
     st.subheader("Raw Data and Line Trend")
     # Raw closing price chart
-    st.line_chart(data['Close'])
+    st.line_chart(downsample(data['Close']))
     last_close = data['Close'].iloc[-1].item()
     first_close = data['Close'].iloc[0].item()
 
@@ -223,46 +148,82 @@ def plot_moving_averages(data):
     st.subheader("Double Moving Averages")
     st.write("Typical combis: 5 and 20 days, 10 and 50 days. When the shorter line crosses above the longer line, it is a bullish sign.")
     st.write("The crossover is simply a confirmation that the new upward momentum is gaining strength. It is a lagging indicator.")
+
+    # Sweep mode: every window pair at once, picking a cell sets the windows below
+    sweep = None
+    if st.checkbox("Sweep all window pairs", key="ma_sweep_mode"):
+        sweep = stages.run('ma_sweep', ma_crossover_sweep, data['Close'].to_numpy(), SWEEP_SHORT, SWEEP_LONG)
+        plot_ma_sweep(sweep[2])
+
+    # Defaults go through session state, which a picked sweep cell also sets
+    st.session_state.setdefault("ma_window1", MA_WINDOWS[0])
+    st.session_state.setdefault("ma_window2", MA_WINDOWS[1])
     col1, col2 = st.columns(2)
     with col1:
-        window1 = st.number_input("Short-term MA Window", min_value=1, value=5, step=1, key="ma_window1")
+        window1 = st.number_input("Short-term MA Window", min_value=1, step=1, key="ma_window1")
     with col2:
-        window2 = st.number_input("Long-term MA Window", min_value=1, value=20, step=1, key="ma_window2")
-
-    # Calculate moving averages based on user input
-    ma_data = data.copy()
-    ma_data['MA_Short'] = ma_data['Close'].rolling(window=window1).mean()
-    ma_data['MA_Long'] = ma_data['Close'].rolling(window=window2).mean()
-
-    # Create the plot using Matplotlib
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(10, 6))
-
-    # Plot the Close price and the two moving averages
-    ax.plot(ma_data.index, ma_data['Close'], label='Close Price', color='white', linestyle='--', linewidth=0.5)
-    ax.plot(ma_data.index, ma_data['MA_Short'], label=f'MA {window1}', color='pink', linewidth=2)
-    ax.plot(ma_data.index, ma_data['MA_Long'], label=f'MA {window2}', color='orange', linewidth=2)
-
-    # Detect buy signals (bullish crossovers)
-    ma_data['Buy_Signal'] = np.where(
-        (ma_data['MA_Short'].shift(1) < ma_data['MA_Long'].shift(1)) & 
-        (ma_data['MA_Short'] >= ma_data['MA_Long']),
-        ma_data['Close'],  # Mark the crossover point with the closing price
-        np.nan # Use NaN for non-crossover points
-    )
-    
-    # Plot the buy signals on the chart
-    ax.scatter(ma_data.index, ma_data['Buy_Signal'], marker='^', color='green', s=200, label='Buy Signal', zorder=5)
-
-    ax.set_title(f'Moving Averages for {window1} and {window2} periods with Buy Signals')
-    ax.set_xlabel('Date')
-    ax.set_ylabel('Price')
-    ax.legend()
-    ax.grid(True, which='both', linestyle=':', alpha=0.5)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    
-    st.pyplot(fig)
+        window2 = st.number_input("Long-term MA Window", min_value=1, step=1, key="ma_window2")
+
+    # Calculate moving averages based on user input, each window is cached separately
+    windows, ma = sweep[:2] if sweep is not None else ((), None)
+    if window1 in windows and window2 in windows:
+        # Already in the sweep's moving averages
+        ma_short = pd.Series(ma[np.searchsorted(windows, window1)], index=data.index)
+        ma_long = pd.Series(ma[np.searchsorted(windows, window2)], index=data.index)
+    else:
+        ma_short = indicators.rolling_mean(data, 'Close', window1)
+        ma_long = indicators.rolling_mean(data, 'Close', window2)
+
+    def draw():
+        # Create the plot using Matplotlib
+        plt.style.use('dark_background')
+        fig, ax = plt.subplots(figsize=(10, 6))
+
+        # Plot the Close price and the two moving averages
+        ax.plot(data.index, data['Close'], label='Close Price', color='white', linestyle='--', linewidth=0.5)
+        ax.plot(data.index, ma_short, label=f'MA {window1}', color='pink', linewidth=2)
+        ax.plot(data.index, ma_long, label=f'MA {window2}', color='orange', linewidth=2)
+
+        # Detect buy signals (bullish crossovers)
+        buy_signal = np.where(
+            (ma_short.shift(1) < ma_long.shift(1)) & 
+            (ma_short >= ma_long),
+            data['Close'],  # Mark the crossover point with the closing price
+            np.nan # Use NaN for non-crossover points
+        )
+    
+        # Plot the buy signals on the chart
+        ax.scatter(data.index, buy_signal, marker='^', color='green', s=200, label='Buy Signal', zorder=5)
+
+        ax.set_title(f'Moving Averages for {window1} and {window2} periods with Buy Signals')
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Price')
+        ax.legend()
+        ax.grid(True, which='both', linestyle=':', alpha=0.5)
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+        return fig
+    charts.show_figure(data, 'moving_averages', draw, window1, window2)
+
+def plot_ma_sweep(returns: pd.DataFrame):
+    """Heatmap of the crossover's total return (long while short MA > long MA) per window pair."""
+    cells = returns.stack().rename('total_return').reset_index()
+    chart = alt.Chart(cells).mark_rect().encode(
+        x=alt.X('long:O', title='Long-term MA Window'),
+        y=alt.Y('short:O', title='Short-term MA Window', sort='descending'),
+        color=alt.Color('total_return:Q', title='Total Return', scale=alt.Scale(scheme='redyellowgreen', domainMid=0)),
+        tooltip=['short', 'long', alt.Tooltip('total_return:Q', format='.1%')],
+    ).add_params(alt.selection_point(name='pair', fields=['short', 'long']))
+    event = st.altair_chart(chart, on_select="rerun", key="ma_sweep")
+
+    # Only a new pick moves the windows, so they can still be typed in afterwards
+    picked = event.selection.get('pair') if event is not None else None
+    if picked and picked != st.session_state.get('ma_sweep_picked'):
+        st.session_state['ma_sweep_picked'] = picked
+        st.session_state['ma_window1'] = int(picked[0]['short'])
+        st.session_state['ma_window2'] = int(picked[0]['long'])
+    best = returns.stack().idxmax()
+    st.write(f"Best pair: MA {best[0]} / MA {best[1]} with a total return of {returns.loc[best]:.1%}. Past returns, no trading costs.")
 
 def show_big_picture_trend(data):
     """Displays the main price chart and a basic trend analysis."""
@@ -270,4 +231,16 @@ def show_big_picture_trend(data):
     st.info("Refer to TradingView's Lux Algo for a comprehensive resistance and support analysis.")
     plot_basic_trend(data)
     plot_support_resistance(data)
+    plot_rolling_trendline_slopes(data)
     plot_moving_averages(data)
+
+def precompute_big_picture_trend(data):
+    """Runs the tab's analyses with the default inputs so they are cached before the tab is opened."""
+    log_high = indicators.log_prices(data, 'High')
+    log_low = indicators.log_prices(data, 'Low')
+    log_close = indicators.log_prices(data, 'Close')
+    stages.run('trendlines', fit_trendlines_high_low, log_high.values, log_low.values, log_close.values)
+    if len(data) >= TREND_LOOKBACK:
+        stages.run('rolling_trendlines', rolling_trendlines_high_low, log_high.values, log_low.values, log_close.values, TREND_LOOKBACK)
+    for window in MA_WINDOWS:
+        indicators.rolling_mean(data, 'Close', window)
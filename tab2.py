@@ -2,20 +2,26 @@ import streamlit as st
 import yfinance as yf
 import pandas as pd
 import pandas_ta as ta
+import indicators
+from downsample import downsample
 
 def rsi(data):
     st.subheader("Relative Strength Index (RSI)")
     st.write("RSI values above 70 indicate overbought conditions, while values below 30 indicate oversold conditions.")
     st.write("Ideal RSI range for trading is between 30 and 70.")
     st.info("In an uptrend, buy dips when RSI is 30-40; in a downtrend, sell rallies when RSI is 60-70.")
-    data['RSI'] = ta.rsi(data['Close'], length=14)
-    st.line_chart(data['RSI'])
+    rsi_data = indicators.rsi(data, length=14)
+    if rsi_data is None:
+        st.info("Not enough data to compute the RSI. A longer `period` is required.")
+        return None
+    st.line_chart(downsample(rsi_data)) # only the chart is downsampled, signals use rsi_data
+    return rsi_data
 
 def macd(data):
     # 2. Moving Average Convergence Divergence (MACD)
     st.subheader("Moving Average Convergence Divergence (MACD)")
     # Ensure the MACD calculation is correct
-    macd_df = ta.macd(data['Close'])
+    macd_df = indicators.macd(data)
     
     if macd_df.empty:
         st.error("MACD data could not be generated. This may be due to insufficient data points for the calculation.")
@@ -34,25 +40,25 @@ def macd(data):
     })
     
     # Create new columns for positive and negative values to allow for custom coloring
-    macd_data['Positive'] = macd_data['Histogram'].apply(lambda x: x if x >= 0 else None)
-    macd_data['Negative'] = macd_data['Histogram'].apply(lambda x: x if x < 0 else None)
+    macd_data['Positive'] = macd_data['Histogram'].where(macd_data['Histogram'] >= 0)
+    macd_data['Negative'] = macd_data['Histogram'].where(macd_data['Histogram'] < 0)
     
     # 2a. MACD Histogram Bar Chart
     st.info("MACD Histogram: The histogram bars turn green (or positive), which visually confirms that the MACD line is now above the signal line.")
-    st.bar_chart(macd_data[['Positive', 'Negative']], color=['#33CC00', '#FF3300'])
+    st.bar_chart(downsample(macd_data[['Positive', 'Negative']], method='minmax'), color=['#33CC00', '#FF3300'])
 
     # 2b. MACD Line and Signal Line Chart
     st.info("MACD Line Crossover: The MACD line crosses above the signal line. This is the primary signal for an increase in upward momentum.")
-    st.line_chart(macd_data[['MACD', 'Signal Line']])
+    st.line_chart(downsample(macd_data[['MACD', 'Signal Line']]))
     return macd_data
 
-def compare_rsi_and_macd_signals(data, macd_data):
+def compare_rsi_and_macd_signals(rsi_data, macd_data):
     # 3. Check for and display signals
     # Define the grace period in days
     grace_period = 10
 
     # Check for RSI bullish signal within the grace period
-    rsi_bullish_crossover_events = (data['RSI'].shift(1) <= 30) & (data['RSI'] > 30)
+    rsi_bullish_crossover_events = (rsi_data.shift(1) <= 30) & (rsi_data > 30)
     rsi_bullish_signal = rsi_bullish_crossover_events.tail(grace_period).any()
 
     # Check for MACD bullish signal within the grace period
@@ -60,7 +66,7 @@ def compare_rsi_and_macd_signals(data, macd_data):
     macd_bullish_signal = macd_bullish_crossover_events.tail(grace_period).any()
     
     # Check for RSI bearish signal within the grace period
-    rsi_bearish_crossover_events = (data['RSI'].shift(1) >= 70) & (data['RSI'] < 70)
+    rsi_bearish_crossover_events = (rsi_data.shift(1) >= 70) & (rsi_data < 70)
     rsi_bearish_signal = rsi_bearish_crossover_events.tail(grace_period).any()
         
     # Check for MACD bearish signal within the grace period
@@ -81,7 +87,13 @@ def show_oscillators(data):
     st.info("Strong Buy Signal: Occurs when the RSI is moving out of the oversold region (e.g., crossing above 30) and the MACD has a bullish crossover (MACD line crosses above the signal line) with green histogram bars. This provides strong confirmation of a potential upward trend.")
     st.info("Strong Sell Signal: Occurs when the RSI is moving out of the overbought region (e.g., dropping below 70) and the MACD has a bearish crossover (MACD line crosses below the signal line) with red histogram bars. This suggests a likely downward trend.")
     
-    rsi(data)
+    rsi_data = rsi(data)
     macd_data = macd(data)
-    compare_rsi_and_macd_signals(data, macd_data)
-    
\ No newline at end of file
+    if rsi_data is not None and macd_data is not None:
+        compare_rsi_and_macd_signals(rsi_data, macd_data)
+    
+
+def precompute_oscillators(data):
+    """Computes the tab's indicators so they are cached before the tab is opened."""
+    indicators.rsi(data, length=14)
+    indicators.macd(data)
@@ -2,15 +2,17 @@ import streamlit as st
 import yfinance as yf
 import pandas as pd
 import pandas_ta as ta
+import indicators
+from downsample import downsample
 
 def simple_volume_analysis(data):
     # Volume Data
     st.subheader("Simple Volume Data")
-    st.bar_chart(data['Volume'])
+    st.bar_chart(downsample(data['Volume'], method='minmax')) # keeps volume spikes
     # Get the latest volume compare with the latest average volume
-    data['Volume_SMA'] = ta.sma(data['Volume'], length=20) # 20-day period SMA
+    volume_sma = indicators.sma(data, 'Volume', length=20) # 20-day period SMA
     latest_volume = data['Volume'].iloc[-1]
-    latest_volume_sma = data['Volume_SMA'].iloc[-1]
+    latest_volume_sma = volume_sma.iloc[-1]
     if latest_volume > 2 * latest_volume_sma:
         st.success("📈 **High Volume Detected**: The current volume is more than double the 20-day average. This indicates strong conviction.")
     elif latest_volume > latest_volume_sma:
@@ -20,11 +22,11 @@ def simple_volume_analysis(data):
 
 def on_balance_volume(data):
     st.subheader("On-Balance Volume (OBV)")
-    data['OBV'] = ta.obv(data['Close'], data['Volume'])
-    st.line_chart(data['OBV'])
-    obv_current = data['OBV'].iloc[-1]
+    obv = indicators.obv(data)
+    st.line_chart(downsample(obv))
+    obv_current = obv.iloc[-1]
 
-    obv_10_days_ago = data['OBV'].iloc[-10]
+    obv_10_days_ago = obv.iloc[-10]
 
     if obv_current > obv_10_days_ago:
         st.success("📈 **Rising OBV**: The OBV is trending up. This indicates buying pressure and confirms the current uptrend.")
@@ -37,7 +39,7 @@ def on_balance_volume(data):
     # Look for divergence over the last 30 trading days
     st.info("Checking for Bullish/Bearish Divergence between Price and OBV. Used for confirmation of potential reversals. 30 days lookback.")
     lookback_period = 30
-    recent_data = data.tail(lookback_period)
+    recent_data = pd.DataFrame({'Close': data['Close'], 'OBV': obv}).tail(lookback_period)
     
     # Divide the data into two halves
     half_period = lookback_period // 2
@@ -65,4 +67,9 @@ def show_volume_confirmation_charts(data):
     """Displays charts for volume to confirm price action."""
     st.header("3. Volume Confirmation")
     simple_volume_analysis(data)
-    on_balance_volume(data)
\ No newline at end of file
+    on_balance_volume(data)
+
+def precompute_volume_confirmation(data):
+    """Computes the tab's indicators so they are cached before the tab is opened."""
+    indicators.sma(data, 'Volume', length=20)
+    indicators.obv(data)
@@ -5,9 +5,11 @@ import mplfinance as mpf
 import matplotlib.pyplot as plt
 from typing import List
 from collections import deque
-from dataclasses import dataclass
-from rolling_window import rw_top, rw_bottom
-from trendline_automation import fit_trendlines_single
+from dataclasses import dataclass, fields
+from rolling_window import rw_extreme_flags
+from trendline_automation import IncrementalTrendlines, fit_trendlines_single
+import stages
+import charts
 
 # --- The Rest of the Head and Shoulders Code ---
 @dataclass
@@ -33,22 +35,85 @@ class HSPattern:
     head_height: float = -1
     pattern_r2: float = -1
 
-def compute_pattern_r2(data: np.array, pat: HSPattern):
-    line0_slope = (pat.l_shoulder_p - pat.neck_start) / (pat.l_shoulder - pat.start_i)
-    line0 = pat.neck_start + np.arange(pat.l_shoulder - pat.start_i) * line0_slope
-    line1_slope = (pat.l_armpit_p - pat.l_shoulder_p) / (pat.l_armpit - pat.l_shoulder)
-    line1 = pat.l_shoulder_p + np.arange(pat.l_armpit - pat.l_shoulder) * line1_slope
-    line2_slope = (pat.head_p - pat.l_armpit_p) / (pat.head - pat.l_armpit)
-    line2 = pat.l_armpit_p + np.arange(pat.head - pat.l_armpit) * line2_slope
-    line3_slope = (pat.r_armpit_p - pat.head_p) / (pat.r_armpit - pat.head)
-    line3 = pat.head_p + np.arange(pat.r_armpit - pat.head) * line3_slope
-    line4_slope = (pat.r_shoulder_p - pat.r_armpit_p) / (pat.r_shoulder - pat.r_armpit)
-    line4 = pat.r_armpit_p + np.arange(pat.r_shoulder - pat.r_armpit) * line4_slope
-    line5_slope = (pat.break_p - pat.r_shoulder_p) / (pat.break_i - pat.r_shoulder)
-    line5 = pat.r_shoulder_p + np.arange(pat.break_i - pat.r_shoulder) * line5_slope
+def _dataclass_dtype(cls):
+    # One structured array field per dataclass field
+    return np.dtype([(f.name, {bool: '?', int: 'i8', float: 'f8'}[f.type]) for f in fields(cls)])
+
+# Dtype of the rows in the pattern tables, one field per HSPattern field
+HS_DTYPE = _dataclass_dtype(HSPattern)
+
+class PatternTable:
+    """
+    Columnar store of detected patterns, one structured array row per event.
+
+    Rows are packed fixed-width records (~150 bytes for H&S, ~110 for flags)
+    instead of one dict-backed dataclass object each. Detectors append single
+    patterns or whole arrays, the buffer grows by doubling. Indexing or
+    iterating gives np.record views, which have the same attributes as the
+    dataclass, so plot_hs and plot_flag take them unchanged. Columns are
+    available as attributes too, e.g. table.break_i.
+    """
+
+    def __init__(self, dtype: np.dtype, rows: np.ndarray = None, capacity: int = 16):
+        self.dtype = np.dtype(dtype)
+        self._buffer = np.recarray(max(capacity, 0 if rows is None else len(rows)), dtype=self.dtype)
+        self._size = 0
+        if rows is not None:
+            self.extend(rows)
+
+    def _reserve(self, n: int):
+        if n > len(self._buffer):
+            buffer = np.recarray(max(n, 2 * len(self._buffer)), dtype=self.dtype)
+            buffer[:self._size] = self._buffer[:self._size]
+            self._buffer = buffer
+
+    def append(self, pattern):
+        """Adds one pattern, any object with an attribute per field (e.g. a HSPattern)."""
+        self._reserve(self._size + 1)
+        row = self._buffer[self._size]
+        for name in self.dtype.names:
+            row[name] = getattr(pattern, name)
+        self._size += 1
+
+    def extend(self, rows: np.ndarray):
+        """Adds a structured array of rows in one copy."""
+        self._reserve(self._size + len(rows))
+        self._buffer[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    @property
+    def rows(self) -> np.recarray:
+        """The filled rows, a view of the buffer."""
+        return self._buffer[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._buffer.nbytes
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, i):
+        return self.rows[i]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getattr__(self, name):
+        # Column access, only reached for names that aren't regular attributes
+        if name.startswith('_') or name not in self.dtype.names:
+            raise AttributeError(name)
+        return self.rows[name]
+
+def _pattern_r2(data: np.array, knots_x, knots_y):
+    # R² of the price against straight lines joining the pattern points
+    lines = []
+    for k in range(len(knots_x) - 1):
+        slope = (knots_y[k + 1] - knots_y[k]) / (knots_x[k + 1] - knots_x[k])
+        lines.append(knots_y[k] + np.arange(knots_x[k + 1] - knots_x[k]) * slope)
     
-    raw_data = data[pat.start_i:pat.break_i]
-    hs_model = np.concatenate([line0, line1, line2, line3, line4, line5])
+    raw_data = data[knots_x[0]:knots_x[-1]]
+    hs_model = np.concatenate(lines)
     
     if len(raw_data) != len(hs_model):
         return np.nan
@@ -63,6 +128,11 @@ def compute_pattern_r2(data: np.array, pat: HSPattern):
     r2 = 1.0 - ss_res / ss_tot
     return r2
 
+def compute_pattern_r2(data: np.array, pat: HSPattern):
+    knots_x = [pat.start_i, pat.l_shoulder, pat.l_armpit, pat.head, pat.r_armpit, pat.r_shoulder, pat.break_i]
+    knots_y = [pat.neck_start, pat.l_shoulder_p, pat.l_armpit_p, pat.head_p, pat.r_armpit_p, pat.r_shoulder_p, pat.break_p]
+    return _pattern_r2(data, knots_x, knots_y)
+
 def check_hs_pattern(extrema_indices: List[int], data: np.array, i: int, early_find: bool = False) -> HSPattern:
     l_shoulder, l_armpit, head, r_armpit = extrema_indices[0], extrema_indices[1], extrema_indices[2], extrema_indices[3]
     if i - r_armpit < 2: return None
@@ -145,25 +215,37 @@ def check_ihs_pattern(extrema_indices: List[int], data: np.array, i: int, early_
     pat.pattern_r2 = compute_pattern_r2(data, pat)
     return pat
 
-def find_hs_patterns(data: np.array, order: int, early_find: bool = False):
-    assert(order >= 1)
-    last_is_top = False
-    recent_extrema = deque(maxlen=5)
-    recent_types = deque(maxlen=5)
-    hs_lock, ihs_lock = False, False
-    ihs_patterns, hs_patterns = [], []
-    for i in range(len(data)):
-        if rw_top(data, i, order):
-            recent_extrema.append(i - order)
+class HSScanner:
+    """
+    find_hs_patterns one bar at a time, for feeds that confirm extrema as
+    bars arrive (rolling_window.RollingExtremaDetector).
+    """
+
+    def __init__(self, order: int, early_find: bool = False):
+        assert(order >= 1)
+        self.order = order
+        self.early_find = early_find
+        self.last_is_top = False
+        self.recent_extrema = deque(maxlen=5)
+        self.recent_types = deque(maxlen=5)
+        self.hs_lock, self.ihs_lock = False, False
+        self.hs_patterns, self.ihs_patterns = PatternTable(HS_DTYPE), PatternTable(HS_DTYPE)
+
+    def step(self, data: np.array, i: int, is_top: bool, is_bottom: bool):
+        # Bar i of data, with whether a top/bottom was confirmed on it.
+        # Returns the names of the tables that got a new pattern on this bar.
+        recent_extrema, recent_types = self.recent_extrema, self.recent_types
+        if is_top:
+            recent_extrema.append(i - self.order)
             recent_types.append(1)
-            ihs_lock, last_is_top = False, True
-        if rw_bottom(data, i, order):
-            recent_extrema.append(i - order)
+            self.ihs_lock, self.last_is_top = False, True
+        if is_bottom:
+            recent_extrema.append(i - self.order)
             recent_types.append(-1)
-            hs_lock, last_is_top = False, False
-        if len(recent_extrema) < 5: continue
+            self.hs_lock, self.last_is_top = False, False
+        if len(recent_extrema) < 5: return []
         hs_alternating, ihs_alternating = True, True
-        if last_is_top:
+        if self.last_is_top:
             for j in range(2, 5):
                 if recent_types[j] == recent_types[j - 1]: ihs_alternating = False
             for j in range(1, 4):
@@ -175,15 +257,162 @@ def find_hs_patterns(data: np.array, order: int, early_find: bool = False):
             for j in range(1, 4):
                 if recent_types[j] == recent_types[j - 1]: ihs_alternating = False
             ihs_extrema, hs_extrema = list(recent_extrema)[0:4], list(recent_extrema)[1:5]
-        if ihs_lock or not ihs_alternating: ihs_pat = None
-        else: ihs_pat = check_ihs_pattern(ihs_extrema, data, i, early_find)
-        if hs_lock or not hs_alternating: hs_pat = None
-        else: hs_pat = check_hs_pattern(hs_extrema, data, i, early_find)
+        if self.ihs_lock or not ihs_alternating: ihs_pat = None
+        else: ihs_pat = check_ihs_pattern(ihs_extrema, data, i, self.early_find)
+        if self.hs_lock or not hs_alternating: hs_pat = None
+        else: hs_pat = check_hs_pattern(hs_extrema, data, i, self.early_find)
+        found = []
         if hs_pat is not None:
-            hs_lock, hs_patterns = True, hs_patterns + [hs_pat]
+            self.hs_lock = True
+            self.hs_patterns.append(hs_pat)
+            found.append('hs_patterns')
         if ihs_pat is not None:
-            ihs_lock, ihs_patterns = True, ihs_patterns + [ihs_pat]
-    return hs_patterns, ihs_patterns
+            self.ihs_lock = True
+            self.ihs_patterns.append(ihs_pat)
+            found.append('ihs_patterns')
+        return found
+
+def find_hs_patterns(data: np.array, order: int, early_find: bool = False):
+    scanner = HSScanner(order, early_find)
+    is_top, is_bottom = rw_extreme_flags(data, order)
+    for i in range(len(data)):
+        scanner.step(data, i, is_top[i], is_bottom[i])
+    return scanner.hs_patterns, scanner.ihs_patterns
+
+class _RangeArgExtreme:
+    # Sparse table answering "first index of the max (or min) of data[l:r + 1]"
+    # for many ranges at once in O(1) each, after O(n log n) setup.
+    def __init__(self, data: np.array, longest: int, find_max: bool):
+        self.data = data
+        self.better = np.greater_equal if find_max else np.less_equal # ties keep the left index
+        self.table = [np.arange(len(data))]
+        k = 1
+        while k * 2 <= max(longest, 1):
+            prev = self.table[-1]
+            a, b = prev[:len(prev) - k], prev[k:]
+            self.table.append(np.where(self.better(data[a], data[b]), a, b))
+            k *= 2
+
+    def query(self, l: np.array, r: np.array) -> np.array:
+        level = np.floor(np.log2(r - l + 1)).astype(int)
+        a = np.empty(len(l), dtype=int)
+        b = np.empty(len(l), dtype=int)
+        for k in np.unique(level):
+            sel = level == k
+            a[sel] = self.table[k][l[sel]]
+            b[sel] = self.table[k][r[sel] - (1 << k) + 1]
+        return np.where(self.better(self.data[a], self.data[b]), a, b)
+
+def _hs_candidates(data: np.array, ext_i: np.array, m: np.array, bars: np.array, inverted: bool, early_find: bool):
+    # Vectorized version of check_hs_pattern/check_ihs_pattern, minus the
+    # pattern start search. Row j tests the extrema ext_i[m[j]:m[j] + 4] at bar bars[j].
+    l_shoulder, l_armpit, head, r_armpit = ext_i[m], ext_i[m + 1], ext_i[m + 2], ext_i[m + 3]
+    ok = bars - r_armpit >= 2
+    l_shoulder, l_armpit, head, r_armpit, bars, m = (v[ok] for v in (l_shoulder, l_armpit, head, r_armpit, bars, m))
+    if len(bars) == 0:
+        return m, bars, bars
+
+    r_shoulder = _RangeArgExtreme(data, int((bars - r_armpit).max()), not inverted).query(r_armpit + 1, bars - 1)
+    r_midpoint = 0.5 * (data[r_shoulder] + data[r_armpit])
+    l_midpoint = 0.5 * (data[l_shoulder] + data[l_armpit])
+    if inverted:
+        ok = data[head] < np.minimum(data[l_shoulder], data[r_shoulder])
+        ok &= ~((data[l_shoulder] > r_midpoint) | (data[r_shoulder] > l_midpoint))
+    else:
+        ok = data[head] > np.maximum(data[l_shoulder], data[r_shoulder])
+        ok &= ~((data[l_shoulder] < r_midpoint) | (data[r_shoulder] < l_midpoint))
+    r_to_h_time = r_shoulder - head
+    l_to_h_time = head - l_shoulder
+    ok &= ~((r_to_h_time > 2.5 * l_to_h_time) | (l_to_h_time > 2.5 * r_to_h_time))
+    neck_run = r_armpit - l_armpit
+    ok &= neck_run != 0
+    neck_slope = (data[r_armpit] - data[l_armpit]) / np.where(neck_run == 0, 1, neck_run)
+    neck_val = data[l_armpit] + (bars - l_armpit) * neck_slope
+    limit = r_midpoint if early_find else neck_val
+    ok &= data[bars] >= limit if inverted else data[bars] <= limit
+    return m[ok], bars[ok], r_shoulder[ok]
+
+def _hs_start(data: np.array, l_shoulder: int, l_armpit: int, r_armpit: int, inverted: bool):
+    # Pattern start search of check_hs_pattern, -1 if there is none
+    neck_slope = (data[r_armpit] - data[l_armpit]) / (r_armpit - l_armpit)
+    j = np.arange(1, r_armpit - l_armpit)
+    neck = data[l_armpit] + (l_shoulder - l_armpit - j) * neck_slope
+    in_range = l_shoulder - j >= 0
+    prices = data[np.maximum(l_shoulder - j, 0)]
+    crossed = (prices > neck) if inverted else (prices < neck)
+    stop = np.flatnonzero(~in_range | crossed)
+    if len(stop) == 0 or not in_range[stop[0]]:
+        return -1, -1
+    return l_shoulder - j[stop[0]], neck[stop[0]]
+
+def find_hs_patterns_batch(data: np.array, order: int, early_find: bool = False):
+    """
+    Same patterns as find_hs_patterns, found with array operations instead of a per bar loop.
+
+    The alternating extrema sequence is extracted first. Each bar is then
+    matched to the 4 extrema find_hs_patterns would test there, and the
+    shoulder, time ratio and neckline tests run on all bars at once. Within
+    each lock period (until the next bottom for H&S, next top for IHS) only
+    the first passing bar is kept, as in the loop.
+
+    Returns:
+        tuple: (hs_patterns, ihs_patterns) as PatternTables of HS_DTYPE rows.
+    """
+    assert(order >= 1)
+    data = np.asarray(data, dtype=float)
+    is_top, is_bottom = rw_extreme_flags(data, order)
+
+    # Extrema in the order find_hs_patterns sees them (top before bottom on the same bar)
+    conf = np.concatenate([np.flatnonzero(is_top), np.flatnonzero(is_bottom)])
+    types = np.concatenate([np.ones(is_top.sum(), dtype=int), -np.ones(is_bottom.sum(), dtype=int)])
+    sort = np.lexsort((-types, conf))
+    conf, types = conf[sort], types[sort]
+    ext_i = conf - order
+
+    # Which 4 extrema each bar tests: the last 5 are ext[k - 5:k]
+    bars = np.arange(len(data))
+    k = np.searchsorted(conf, bars, side='right')
+    bars, k = bars[k >= 5], k[k >= 5]
+    last_is_top = types[k - 1] == 1
+    alternating = np.zeros(len(types) + 1, dtype=bool)
+    if len(types) >= 4:
+        alternating[:len(types) - 3] = (types[:-3] != types[1:-2]) & (types[1:-2] != types[2:-1]) & (types[2:-1] != types[3:])
+
+    results = []
+    for inverted, lock_reset in ((False, is_bottom), (True, is_top)):
+        m = k - 5 + (last_is_top == inverted)
+        use = alternating[m]
+        cand_m, cand_bars, cand_rs = _hs_candidates(data, ext_i, m[use], bars[use], inverted, early_find)
+
+        # Pattern start only depends on the extrema, test each candidate once
+        starts = {c: _hs_start(data, ext_i[c], ext_i[c + 1], ext_i[c + 3], inverted) for c in np.unique(cand_m).tolist()}
+        has_start = np.array([starts[c][0] != -1 for c in cand_m.tolist()], dtype=bool)
+        cand_m, cand_bars, cand_rs = cand_m[has_start], cand_bars[has_start], cand_rs[has_start]
+
+        # First passing bar in each lock period
+        epoch = np.cumsum(lock_reset)[cand_bars]
+        _, first = np.unique(epoch, return_index=True)
+        cand_m, cand_bars, cand_rs = cand_m[first], cand_bars[first], cand_rs[first]
+
+        pats = np.recarray(len(cand_m), dtype=HS_DTYPE)
+        for row, (c, i, r_shoulder) in enumerate(zip(cand_m.tolist(), cand_bars.tolist(), cand_rs.tolist())):
+            l_shoulder, l_armpit, head, r_armpit = ext_i[c:c + 4].tolist()
+            neck_slope = (data[r_armpit] - data[l_armpit]) / (r_armpit - l_armpit)
+            neck_at_head = data[l_armpit] + (head - l_armpit) * neck_slope
+            pat_start, neck_start = starts[c]
+            pat = pats[row]
+            pat.inverted = inverted
+            pat.l_shoulder, pat.r_shoulder, pat.l_armpit, pat.r_armpit, pat.head = l_shoulder, r_shoulder, l_armpit, r_armpit, head
+            pat.l_shoulder_p, pat.r_shoulder_p, pat.l_armpit_p, pat.r_armpit_p, pat.head_p = data[l_shoulder], data[r_shoulder], data[l_armpit], data[r_armpit], data[head]
+            pat.start_i, pat.break_i, pat.break_p = pat_start, i, data[i]
+            pat.neck_start, pat.neck_end = neck_start, data[l_armpit] + (i - l_armpit) * neck_slope
+            pat.neck_slope = neck_slope
+            pat.head_width = r_armpit - l_armpit
+            pat.head_height = neck_at_head - data[head] if inverted else data[head] - neck_at_head
+            pat.pattern_r2 = compute_pattern_r2(data, pat)
+        results.append(PatternTable(HS_DTYPE, pats))
+
+    return results[0], results[1]
 
 def plot_hs(candle_data: pd.DataFrame, pat: HSPattern, pad: int = 2):
     if pad < 0: pad = 0
@@ -209,20 +438,18 @@ def show_head_and_shoulders_trend(data):
         return
     
     # Run the pattern detection
-    hs_patterns, ihs_patterns = find_hs_patterns(data['Close'].to_numpy(), order=5)
+    hs_patterns, ihs_patterns = stages.run('hs_patterns', find_hs_patterns_batch, data['Close'].to_numpy(), order=5)
     
     if hs_patterns:
         st.subheader("Bearish Head & Shoulders Pattern Found 📉")
         for pat in hs_patterns:
-            fig = plot_hs(data, pat)
-            st.pyplot(fig)
+            charts.show_figure(data, 'hs', lambda: plot_hs(data, pat), pat.start_i, pat.break_i)
             st.success(f"Bearish H&S Pattern detected from {data.index[pat.start_i].strftime('%Y-%m-%d')} to {data.index[pat.break_i].strftime('%Y-%m-%d')}. This suggests a potential downtrend.")
     
     if ihs_patterns:
         st.subheader("Bullish (Inverted) Head & Shoulders Pattern Found 📈")
         for pat in ihs_patterns:
-            fig = plot_hs(data, pat)
-            st.pyplot(fig)
+            charts.show_figure(data, 'ihs', lambda: plot_hs(data, pat), pat.start_i, pat.break_i)
             st.success(f"Bullish IHS Pattern detected from {data.index[pat.start_i].strftime('%Y-%m-%d')} to {data.index[pat.break_i].strftime('%Y-%m-%d')}. This suggests a potential uptrend.")
             
     if not hs_patterns and not ihs_patterns:
@@ -246,28 +473,86 @@ class FlagPattern:
     resist_intercept: float = -1.
     resist_slope: float = -1.
 
-def check_bull_pattern_trendline(pending: FlagPattern, data: np.array, i:int, order:int):
+# Dtype of the rows in the flag and pennant tables
+FLAG_DTYPE = _dataclass_dtype(FlagPattern)
+# Relative to the pole's prices. Incremental and batch trendlines agree to
+# ~1e-14, anything closer to a breakout or a pivot tie than this is refit
+EXACT_TOL = 1e-9
+
+class FlagTracker:
+    """
+    Running state of a pending flag, advanced one bar at a time.
+
+    Holds the max/min of the bars after the pole tip and an incremental
+    trendline fit of the flag, so each bar only adds the previous bar instead
+    of rescanning and refitting the whole flag window.
+    """
+
+    def __init__(self, pattern: FlagPattern):
+        self.pattern = pattern
+        self.fit = IncrementalTrendlines() # fit of data[tip_x:...], caught up when needed
+        self.seen = pattern.tip_x + 1 # bars before this are in the max/min
+        self.after_tip_max = -np.inf # max of data[tip_x + 1:i]
+        self.after_tip_min = np.inf # min of data[tip_x + 1:i]
+        self.dead = False # set once a check fails in a way that can't recover
+
+    def advance(self, data: np.array, i: int):
+        # Add bars up to (not including) the current bar
+        if i > self.seen:
+            self.after_tip_max = max(self.after_tip_max, data[self.seen:i].max())
+            self.after_tip_min = min(self.after_tip_min, data[self.seen:i].min())
+            self.seen = i
+
+    def trendlines(self, data: np.array, i: int, support: bool):
+        """
+        Support and resistance coefs of data[tip_x:i], exactly as
+        fit_trendlines_single gives them.
+
+        The running sums round differently from np.polyfit, so the incremental
+        fit is only used when data[i] is clearly on the unbroken side of the
+        checked line (support or resistance) and neither pivot is nearly
+        tied. Otherwise, and so for every confirmed pattern, the flag is refit.
+        """
+        for j in range(self.pattern.tip_x + len(self.fit), i):
+            self.fit.append(data[j])
+        coefs = self.fit.fit()
+        slope, intercept = coefs[0] if support else coefs[1]
+        line = intercept + slope * (i - self.pattern.tip_x + 1)
+        tol = EXACT_TOL * (abs(self.pattern.tip_y) + abs(self.pattern.base_y))
+        unbroken = data[i] >= line + tol if support else data[i] <= line - tol
+        if unbroken and self.fit.pivot_gap > tol:
+            return coefs
+        return fit_trendlines_single(data[self.pattern.tip_x:i])
+
+def check_bull_pattern_trendline(pending: FlagTracker, data: np.array, i:int, order:int):
+    pending.advance(data, i)
+    pattern = pending.pattern
+
     # Check if data max less than pole tip
-    if data[pending.tip_x + 1 : i].max() > pending.tip_y:
+    # The max, flag width and flag height only grow, so these failures are final
+    if pending.after_tip_max > pattern.tip_y:
+        pending.dead = True
         return False
 
-    flag_min = data[pending.tip_x:i].min()
+    flag_min = min(pattern.tip_y, pending.after_tip_min)
 
     # Find flag/pole height and width
-    pole_height = pending.tip_y - pending.base_y
-    pole_width = pending.tip_x - pending.base_x
+    pole_height = pattern.tip_y - pattern.base_y
+    pole_width = pattern.tip_x - pattern.base_x
     
-    flag_height = pending.tip_y - flag_min
-    flag_width = i - pending.tip_x
+    flag_height = pattern.tip_y - flag_min
+    flag_width = i - pattern.tip_x
 
     if flag_width > pole_width * 0.5: # Flag should be less than half the width of pole
+        pending.dead = True
         return False
 
     if flag_height > pole_height * 0.75: # Flag should smaller vertically than preceding trend
+        pending.dead = True
         return False
 
     # Find trendlines going from flag tip to the previous bar (not including current bar)
-    support_coefs, resist_coefs = fit_trendlines_single(data[pending.tip_x:i])
+    support_coefs, resist_coefs = pending.trendlines(data, i, support=False)
     support_slope, support_intercept = support_coefs[0], support_coefs[1]
     resist_slope, resist_intercept = resist_coefs[0], resist_coefs[1]
 
@@ -278,46 +563,53 @@ def check_bull_pattern_trendline(pending: FlagPattern, data: np.array, i:int, or
 
     # Pattern is confiremd, fill out pattern details in pending
     if support_slope > 0:
-        pending.pennant = True
+        pattern.pennant = True
     else:
-        pending.pennant = False
-
-    pending.conf_x = i
-    pending.conf_y = data[i]
-    pending.flag_width = flag_width
-    pending.flag_height = flag_height
-    pending.pole_width = pole_width
-    pending.pole_height = pole_height
+        pattern.pennant = False
+
+    pattern.conf_x = i
+    pattern.conf_y = data[i]
+    pattern.flag_width = flag_width
+    pattern.flag_height = flag_height
+    pattern.pole_width = pole_width
+    pattern.pole_height = pole_height
     
-    pending.support_slope = support_slope
-    pending.support_intercept = support_intercept
-    pending.resist_slope = resist_slope
-    pending.resist_intercept = resist_intercept
+    pattern.support_slope = support_slope
+    pattern.support_intercept = support_intercept
+    pattern.resist_slope = resist_slope
+    pattern.resist_intercept = resist_intercept
     
     return True
 
-def check_bear_pattern_trendline(pending: FlagPattern, data: np.array, i:int, order:int):
-    # Check if data max less than pole tip
-    if data[pending.tip_x + 1 : i].min() < pending.tip_y:
+def check_bear_pattern_trendline(pending: FlagTracker, data: np.array, i:int, order:int):
+    pending.advance(data, i)
+    pattern = pending.pattern
+
+    # Check if data min greater than pole tip
+    # The min, flag width and flag height only grow, so these failures are final
+    if pending.after_tip_min < pattern.tip_y:
+        pending.dead = True
         return False
 
-    flag_max = data[pending.tip_x:i].max()
+    flag_max = max(pattern.tip_y, pending.after_tip_max)
 
     # Find flag/pole height and width
-    pole_height = pending.base_y - pending.tip_y
-    pole_width = pending.tip_x - pending.base_x
+    pole_height = pattern.base_y - pattern.tip_y
+    pole_width = pattern.tip_x - pattern.base_x
     
-    flag_height = flag_max - pending.tip_y
-    flag_width = i - pending.tip_x
+    flag_height = flag_max - pattern.tip_y
+    flag_width = i - pattern.tip_x
 
     if flag_width > pole_width * 0.5: # Flag should be less than half the width of pole
+        pending.dead = True
         return False
 
     if flag_height > pole_height * 0.75: # Flag should smaller vertically than preceding trend
+        pending.dead = True
         return False
 
     # Find trendlines going from flag tip to the previous bar (not including current bar)
-    support_coefs, resist_coefs = fit_trendlines_single(data[pending.tip_x:i])
+    support_coefs, resist_coefs = pending.trendlines(data, i, support=True)
     support_slope, support_intercept = support_coefs[0], support_coefs[1]
     resist_slope, resist_intercept = resist_coefs[0], resist_coefs[1]
 
@@ -328,68 +620,91 @@ def check_bear_pattern_trendline(pending: FlagPattern, data: np.array, i:int, or
 
     # Pattern is confiremd, fill out pattern details in pending
     if resist_slope < 0:
-        pending.pennant = True
+        pattern.pennant = True
     else:
-        pending.pennant = False
-
-    pending.conf_x = i
-    pending.conf_y = data[i]
-    pending.flag_width = flag_width
-    pending.flag_height = flag_height
-    pending.pole_width = pole_width
-    pending.pole_height = pole_height
+        pattern.pennant = False
+
+    pattern.conf_x = i
+    pattern.conf_y = data[i]
+    pattern.flag_width = flag_width
+    pattern.flag_height = flag_height
+    pattern.pole_width = pole_width
+    pattern.pole_height = pole_height
     
-    pending.support_slope = support_slope
-    pending.support_intercept = support_intercept
-    pending.resist_slope = resist_slope
-    pending.resist_intercept = resist_intercept
+    pattern.support_slope = support_slope
+    pattern.support_intercept = support_intercept
+    pattern.resist_slope = resist_slope
+    pattern.resist_intercept = resist_intercept
     
     return True
 
-def find_flags_pennants_trendline(data: np.array, order:int):
-    assert(order >= 3)
-    pending_bull = None # Pending pattern
-    pending_bear = None # Pending pattern
-    last_bottom = -1
-    last_top = -1
-    bull_pennants = []
-    bear_pennants = []
-    bull_flags = []
-    bear_flags = []
-    
-    for i in range(len(data)):
-        if rw_top(data, i, order):
-            last_top = i - order
-            if last_bottom != -1:
-                pending = FlagPattern(last_bottom, data[last_bottom])
-                pending.tip_x = last_top
-                pending.tip_y = data[last_top]
-                pending_bull = pending
-        
-        if rw_bottom(data, i, order):
-            last_bottom = i - order
-            if last_top != -1:
-                pending = FlagPattern(last_top, data[last_top])
-                pending.tip_x = last_bottom
-                pending.tip_y = data[last_bottom]
-                pending_bear = pending
+class FlagScanner:
+    """
+    find_flags_pennants_trendline one bar at a time, for feeds that confirm
+    extrema as bars arrive (rolling_window.RollingExtremaDetector).
+    """
 
+    def __init__(self, order: int):
+        assert(order >= 3)
+        self.order = order
+        self.pending_bull = None # Pending pattern
+        self.pending_bear = None # Pending pattern
+        self.last_bottom = -1
+        self.last_top = -1
+        # Only the pending patterns are FlagPattern objects, confirmed ones are packed into tables
+        self.bull_pennants = PatternTable(FLAG_DTYPE)
+        self.bear_pennants = PatternTable(FLAG_DTYPE)
+        self.bull_flags = PatternTable(FLAG_DTYPE)
+        self.bear_flags = PatternTable(FLAG_DTYPE)
+
+    def step(self, data: np.array, i: int, is_top: bool, is_bottom: bool):
+        # Bar i of data, with whether a top/bottom was confirmed on it.
+        # Returns the names of the tables that got a new pattern on this bar.
+        order = self.order
+        if is_top:
+            self.last_top = i - order
+            if self.last_bottom != -1:
+                pending = FlagPattern(self.last_bottom, data[self.last_bottom])
+                pending.tip_x = self.last_top
+                pending.tip_y = data[self.last_top]
+                self.pending_bull = FlagTracker(pending)
+        
+        if is_bottom:
+            self.last_bottom = i - order
+            if self.last_top != -1:
+                pending = FlagPattern(self.last_top, data[self.last_top])
+                pending.tip_x = self.last_bottom
+                pending.tip_y = data[self.last_bottom]
+                self.pending_bear = FlagTracker(pending)
+
+        found = []
+        pending_bear = self.pending_bear
         if pending_bear is not None:
             if check_bear_pattern_trendline(pending_bear, data, i, order):
-                if pending_bear.pennant:
-                    bear_pennants.append(pending_bear)
-                else:
-                    bear_flags.append(pending_bear)
-                pending_bear = None
+                name = 'bear_pennants' if pending_bear.pattern.pennant else 'bear_flags'
+                getattr(self, name).append(pending_bear.pattern)
+                found.append(name)
+                self.pending_bear = None
+            elif pending_bear.dead:
+                self.pending_bear = None
         
+        pending_bull = self.pending_bull
         if pending_bull is not None:
             if check_bull_pattern_trendline(pending_bull, data, i, order):
-                if pending_bull.pennant:
-                    bull_pennants.append(pending_bull)
-                else:
-                    bull_flags.append(pending_bull)
-                pending_bull = None
-    return bull_flags, bear_flags, bull_pennants, bear_pennants
+                name = 'bull_pennants' if pending_bull.pattern.pennant else 'bull_flags'
+                getattr(self, name).append(pending_bull.pattern)
+                found.append(name)
+                self.pending_bull = None
+            elif pending_bull.dead:
+                self.pending_bull = None
+        return found
+
+def find_flags_pennants_trendline(data: np.array, order:int):
+    scanner = FlagScanner(order)
+    is_top, is_bottom = rw_extreme_flags(data, order)
+    for i in range(len(data)):
+        scanner.step(data, i, is_top[i], is_bottom[i])
+    return scanner.bull_flags, scanner.bear_flags, scanner.bull_pennants, scanner.bear_pennants
 
 def plot_flag(candle_data: pd.DataFrame, pattern: FlagPattern, pad: int = 2):
     """
@@ -446,31 +761,27 @@ def show_flag_and_pennant(data):
     data_close = data['Close'].to_numpy()
     
     # We will use a smaller `order` to make the detection more sensitive.
-    bull_flags, bear_flags, bull_pennants, bear_pennants = find_flags_pennants_trendline(data_close, order=10)
+    bull_flags, bear_flags, bull_pennants, bear_pennants = stages.run('flags', find_flags_pennants_trendline, data_close, order=10)
     
     # Display Bullish Patterns
     if bull_flags or bull_pennants:
         st.subheader("Bullish Continuation Patterns Found 📈")
         for pat in bull_flags:
             st.success(f"Bullish Flag Pattern detected, suggesting a continuation of the uptrend.")
-            fig = plot_flag(data, pat)
-            st.pyplot(fig)
+            charts.show_figure(data, 'bull_flag', lambda: plot_flag(data, pat), pat.base_x, pat.conf_x)
         for pat in bull_pennants:
             st.success(f"Bullish Pennant Pattern detected, suggesting a continuation of the uptrend.")
-            fig = plot_flag(data, pat)
-            st.pyplot(fig)
+            charts.show_figure(data, 'bull_pennant', lambda: plot_flag(data, pat), pat.base_x, pat.conf_x)
     
     # Display Bearish Patterns
     if bear_flags or bear_pennants:
         st.subheader("Bearish Continuation Patterns Found 📉")
         for pat in bear_flags:
             st.success(f"Bearish Flag Pattern detected, suggesting a continuation of the downtrend.")
-            fig = plot_flag(data, pat)
-            st.pyplot(fig)
+            charts.show_figure(data, 'bear_flag', lambda: plot_flag(data, pat), pat.base_x, pat.conf_x)
         for pat in bear_pennants:
             st.success(f"Bearish Pennant Pattern detected, suggesting a continuation of the downtrend.")
-            fig = plot_flag(data, pat)
-            st.pyplot(fig)
+            charts.show_figure(data, 'bear_pennant', lambda: plot_flag(data, pat), pat.base_x, pat.conf_x)
             
     if not (bull_flags or bull_pennants or bear_flags or bear_pennants):
         st.error("No Flag or Pennant patterns detected in the selected period.")
@@ -479,4 +790,11 @@ def show_reversal_continuation_patterns(data):
     st.header("4a. Reversal Patterns")
     show_head_and_shoulders_trend(data)
     st.header("4b. Continuation Patterns")
-    show_flag_and_pennant(data)
\ No newline at end of file
+    show_flag_and_pennant(data)
+
+def precompute_reversal_continuation_patterns(data):
+    """Runs the pattern scans so they are cached before the tab is opened."""
+    if len(data) < 100:
+        return
+    stages.run('hs_patterns', find_hs_patterns_batch, data['Close'].to_numpy(), order=5)
+    stages.run('flags', find_flags_pennants_trendline, data['Close'].to_numpy(), order=10)
@@ -1,102 +1,78 @@
+import asyncio
+import os
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-from finvader import finvader
-import tweepy
+import matplotlib.pyplot as plt
+import stages
+import charts
+from news_sources import NewsAggregator, RSSNewsSource, TwitterNewsSource, YahooNewsSource
+from news_store import NewsStore
+from sentiment import ScoreCache, score_texts
 
-# ---------------- Sentiment Analysis ----------------
-def analyze_sentiment_with_finvader(text):
-    """Analyzes sentiment using the FinVADER library."""
-    scores = finvader(
-        text,
-        use_sentibignomics=True, 
-        use_henry=True, 
-        indicator="compound"
-    )
-    return scores
-
-# ---------------- Yahoo Finance ----------------
-@st.cache_data(show_spinner=False)
-def get_yahoo_news(ticker):
-    news_data = []
-    try:
-        yf_news = yf.Ticker(ticker).news
-        for item in yf_news:
-            content = item.get('content', {})
-            news_data.append({
-                'title': content.get('title', 'No Title'),
-                'summary': content.get('summary', ''),
-                'link': content.get('canonicalUrl', {}).get('url', '#'),
-                'source': content.get('provider', {}).get('displayName', 'Yahoo Finance')
-            })
-    except Exception as e:
-        st.error(f"Error fetching Yahoo Finance news: {e}")
-    return news_data
-
-# ---------------- Twitter v2 ----------------
-@st.cache_data(show_spinner=False)
-def get_twitter_news(ticker, bearer_token):
-    """Fetch recent tweets mentioning the stock ticker using free Twitter v2 API."""
-    client = tweepy.Client(bearer_token=bearer_token)
-    # Plain ticker, no $ or operators
-    # query = f"{ticker.strip().lstrip('$')} -is:retweet"
-    # print('query +++++++++++ '+query)
-    articles = []
-
-    try:
-        tweets = client.search_recent_tweets(query="APPL")
-        if tweets.data:
-            for t in tweets.data:
-                articles.append({
-                    'title': t.text[:50] + "...",
-                    'summary': t.text,
-                    'link': f"https://twitter.com/i/web/status/{t.id}",
-                    'source': 'Twitter'
-                })
-    except Exception as e:
-        st.error(f"Error fetching Twitter data: {e}")
-
-    return articles
-
-# ---------------- Aggregate All News ----------------
-@st.cache_data(show_spinner=False)
-def get_all_news(ticker, twitter_bearer_token=None):
-    news_data = []
+SENTIMENT_CACHE_PATH = ".sentiment_cache.sqlite" # Scores of every text seen so far, by content hash
+NEWS_STORE_PATH = ".news_store.sqlite" # Every scored article per ticker, with its publish time
+SENTIMENT_WINDOW = "7D" # Rolling window of the sentiment vs price chart
 
-    # Yahoo Finance
-    news_data.extend(get_yahoo_news(ticker))
-
-    # Twitter free account has 0 functionality, not able to retrieve any tweets.
-    # Twitter
-    # if twitter_bearer_token:
-    #     news_data.extend(get_twitter_news(ticker, twitter_bearer_token))
-
-    return news_data
-
-# ---------------- Streamlit App ----------------
-def show_news_with_sentiment(ticker):
-    st.header(f"Recent News & Sentiment Analysis for {ticker}")
-    
-    news = get_all_news(ticker, "AAAAAAAAAAAAAAAAAAAAADsv4AEAAAAAs4N4GxqZq081XWQcWX6qiH2Ugns%3DcASnHizOm98cF12ZC8X0Kb3RDunYbXs2pZxN3Rfv5JDP18Ulhi")
-    if not news:
-        st.info("No news found for this tsicker.")
-        return
+# ---------------- Sentiment Analysis ----------------
+@st.cache_resource
+def get_score_cache(path):
+    return ScoreCache(path)
 
+def score_articles(news):
+    """Scores every article (title and summary) in one batch and returns one row per article."""
+    texts = [item['title'] + " " + item['summary'] for item in news]
+    scores = score_texts(texts, get_score_cache(SENTIMENT_CACHE_PATH))
     sentiment_data = []
-    for item in news:
-        text = item['title'] + " " + item['summary']
-        score = analyze_sentiment_with_finvader(text)
+    for item, score in zip(news, scores):
         sentiment_data.append({
             'Title': item['title'],
             'Source': item['source'],
             'Score': score,
             'Link': item['link']
         })
+    return sentiment_data
+
+@st.cache_resource
+def get_news_store(path):
+    return NewsStore(path)
+
+def store_articles(ticker, news, sentiment_data):
+    """Keeps the scored articles, only new ones change the stored aggregates."""
+    return get_news_store(NEWS_STORE_PATH).add(ticker, news, [row['Score'] for row in sentiment_data])
+
+# ---------------- News Sources ----------------
+# RSS feeds queried next to Yahoo Finance, {ticker} is filled in
+NEWS_FEEDS = (
+    ("Yahoo Finance RSS", "https://feeds.finance.yahoo.com/rss/2.0/headline?s={ticker}&region=US&lang=en-US"),
+    ("Google News", "https://news.google.com/rss/search?q={ticker}+stock&hl=en-US&gl=US&ceid=US:en"),
+)
 
+@st.cache_resource
+def get_news_aggregator(feeds=NEWS_FEEDS, twitter_bearer_token=None):
+    sources = [YahooNewsSource()] + [RSSNewsSource(name, url) for name, url in feeds]
+    # Twitter free account has 0 functionality, so it is only queried when asked for
+    if twitter_bearer_token:
+        sources.append(TwitterNewsSource(twitter_bearer_token))
+    return NewsAggregator(sources)
+
+def get_twitter_bearer_token():
+    """TWITTER_BEARER_TOKEN from Streamlit secrets or the environment, None if neither has it."""
+    try:
+        token = st.secrets.get("TWITTER_BEARER_TOKEN")
+    except FileNotFoundError: # no secrets.toml
+        token = None
+    return token or os.environ.get("TWITTER_BEARER_TOKEN") or None
+
+def get_all_news(ticker, twitter_bearer_token=None):
+    """Articles from every source, deduplicated. Blocks until every source answered or timed out."""
+    return get_news_aggregator(NEWS_FEEDS, twitter_bearer_token).fetch_all(ticker)
+
+# ---------------- Streamlit App ----------------
+def show_sentiment(news, sentiment_data):
     # DataFrame and Average
     df_sentiment = pd.DataFrame(sentiment_data)
     avg_score = df_sentiment['Score'].mean()
-    st.markdown(f"**Average Sentiment Score:** {avg_score:.3f}")
+    st.markdown(f"**Average Sentiment Score:** {avg_score:.3f} ({len(news)} articles)")
     if avg_score > 0.05:
         st.success("Overall news sentiment is positive 👍")
     elif avg_score < -0.05:
@@ -108,9 +84,78 @@ def show_news_with_sentiment(ticker):
     st.markdown("---")
 
     # Display each article
-    for item_data in sentiment_data:
+    for item, item_data in zip(news, sentiment_data):
         st.subheader(f"[{item_data['Title']}]({item_data['Link']})")
         st.write(f"Source: {item_data['Source']}")
         st.write(f"**Score: {item_data['Score']}**")
-        st.write(f"Summary: {news[sentiment_data.index(item_data)]['summary']}")
+        st.write(f"Summary: {item['summary']}")
         st.markdown("---")
+
+def plot_sentiment_vs_price(data, ticker):
+    st.subheader("Sentiment vs Price")
+    store = get_news_store(NEWS_STORE_PATH)
+    rolling = store.rolling(ticker, SENTIMENT_WINDOW, start=data.index[0])
+    if rolling.empty:
+        st.info("No stored news in this period yet. Articles are kept each time the news is fetched.")
+        return
+    st.write(f"Mean score of every stored {ticker} article over a rolling {SENTIMENT_WINDOW} window, on each day with news.")
+
+    def draw():
+        plt.style.use('dark_background')
+        fig, ax1 = plt.subplots(figsize=(10, 6))
+        ax2 = ax1.twinx()
+        ax1.plot(data.index, data['Close'], label='Close Price', color='white', linewidth=1)
+        ax2.plot(rolling.index, rolling['score'], label=f'Sentiment ({SENTIMENT_WINDOW})', color='orange', marker='o', markersize=3, linewidth=1.5)
+        ax2.axhline(0, color='grey', linestyle=':', linewidth=1)
+        ax1.set_xlabel('Date')
+        ax1.set_ylabel('Price')
+        ax2.set_ylabel('Sentiment Score')
+        ax2.legend()
+        ax1.grid(True, which='both', linestyle=':', alpha=0.5)
+        plt.setp(ax1.get_xticklabels(), rotation=45)
+        plt.tight_layout()
+        return fig
+    # The stored article count changes whenever new articles are added
+    charts.show_figure(data, 'sentiment_vs_price', draw, SENTIMENT_WINDOW, store.count(ticker))
+
+def show_news_with_sentiment(ticker, data=None):
+    st.header(f"Recent News & Sentiment Analysis for {ticker}")
+    # Only offered when a token is configured
+    twitter_token = get_twitter_bearer_token()
+    use_twitter = twitter_token is not None and st.checkbox("Include Twitter", value=False, key="news_twitter")
+    aggregator = get_news_aggregator(NEWS_FEEDS, twitter_token if use_twitter else None)
+
+    # Sources are queried together, the page is redrawn as each one answers
+    status = st.empty()
+    overlay = st.container()
+    body = st.empty()
+    news = []
+
+    async def stream():
+        done = 0
+        async for name, articles, error in aggregator.stream(ticker):
+            done += 1
+            if error:
+                st.warning(f"{name}: {error}")
+            status.caption(f"{done} of {len(aggregator.sources)} news sources answered")
+            if not articles:
+                continue
+            news.extend(articles)
+            # Articles already scored come from the score cache
+            sentiment_data = stages.run('sentiment', score_articles, news)
+            store_articles(ticker, articles, sentiment_data[-len(articles):])
+            with body.container():
+                show_sentiment(news, sentiment_data)
+
+    asyncio.run(stream())
+    if not news:
+        st.info("No news found for this ticker.")
+    if data is not None and not data.empty:
+        with overlay:
+            plot_sentiment_vs_price(data, ticker)
+
+def precompute_news_with_sentiment(ticker):
+    """Fetches and scores the news so it is cached before the tab is opened."""
+    news = get_all_news(ticker) # the sources the tab queries by default
+    if news:
+        store_articles(ticker, news, stages.run('sentiment', score_articles, news))
@@ -0,0 +1,33 @@
+"""
+Flags and pennants found with the incremental trendlines against refitting
+the whole flag with fit_trendlines_single on every bar, as tab4 did before.
+The results must be identical, bit for bit, including on rounded prices
+where breakouts land exactly on a trendline and pivots tie.
+"""
+import numpy as np
+import pytest
+import tab4
+from trendline_automation import fit_trendlines_single
+
+
+def refit_every_bar(self, data, i, support):
+    return fit_trendlines_single(data[self.pattern.tip_x:i])
+
+
+def prices(kind: str, seed: int):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, int(rng.integers(300, 3000)))))
+    return {'raw': close, 'whole': close.round(), 'cents': close.round(2)}[kind]
+
+
+@pytest.mark.parametrize("kind", ['raw', 'whole', 'cents'])
+@pytest.mark.parametrize("order", [3, 5, 10])
+def test_matches_batch_fit(kind, order, monkeypatch):
+    for seed in range(10):
+        data = prices(kind, seed)
+        incremental = tab4.find_flags_pennants_trendline(data, order)
+        with monkeypatch.context() as patch:
+            patch.setattr(tab4.FlagTracker, 'trendlines', refit_every_bar)
+            batch = tab4.find_flags_pennants_trendline(data, order)
+        for a, b in zip(incremental, batch):
+            assert a.rows.tobytes() == b.rows.tobytes()
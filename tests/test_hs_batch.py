@@ -0,0 +1,27 @@
+"""
+find_hs_patterns_batch against the per-bar find_hs_patterns loop it
+replaces. The tables must be identical, bit for bit, on raw and rounded
+prices (ties between extrema and flat stretches) and with early_find.
+"""
+import numpy as np
+import pytest
+from tab4 import find_hs_patterns, find_hs_patterns_batch
+
+
+def prices(kind: str, seed: int):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, int(rng.integers(300, 3000)))))
+    return {'raw': close, 'whole': close.round(), 'cents': close.round(2)}[kind]
+
+
+@pytest.mark.parametrize("kind", ['raw', 'whole', 'cents'])
+@pytest.mark.parametrize("order", [2, 3, 5])
+@pytest.mark.parametrize("early_find", [False, True])
+def test_matches_loop(kind, order, early_find):
+    for seed in range(10):
+        data = prices(kind, seed)
+        batch = find_hs_patterns_batch(data, order, early_find)
+        loop = find_hs_patterns(data, order, early_find)
+        for a, b in zip(batch, loop):
+            assert len(a) == len(b)
+            assert a.rows.tobytes() == b.rows.tobytes()
@@ -0,0 +1,54 @@
+"""
+The incremental indicators against pandas_ta on the whole series. Bars are
+fed one at a time, and on some of them a provisional value is sent first
+and then revised to the real one, as streaming does for the open candle.
+The outputs must match at every bar, NaN warm-up positions included.
+"""
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+import pytest
+from indicators import IncrementalIndicators
+
+
+def bars(seed: int, count: int = 400):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+    volume = rng.lognormal(14, 0.5, count).round()
+    close[count // 3:count // 3 + 5] = close[count // 3] # flat run, zero changes
+    return pd.Series(close), pd.Series(volume)
+
+
+def stream(close, volume, seed: int):
+    rng = np.random.default_rng(seed)
+    state = IncrementalIndicators()
+    out = []
+    for c, v in zip(close, volume):
+        if rng.random() < 0.3:
+            state.update(c * rng.uniform(0.95, 1.05), v * rng.uniform(0.5, 1.5)) # provisional bar
+            for _ in range(int(rng.integers(0, 3))):
+                state.revise(c * rng.uniform(0.95, 1.05), v * rng.uniform(0.5, 1.5))
+            out.append(state.revise(c, v))
+        else:
+            out.append(state.update(c, v))
+    return pd.DataFrame(out)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_pandas_ta(seed):
+    close, volume = bars(seed)
+    got = stream(close, volume, seed)
+    macd = ta.macd(close)
+    expected = {
+        'RSI': ta.rsi(close),
+        'MACD': macd['MACD_12_26_9'],
+        'Histogram': macd['MACDh_12_26_9'],
+        'Signal Line': macd['MACDs_12_26_9'],
+        'OBV': ta.obv(close, volume),
+        'Volume_SMA': ta.sma(volume, length=20),
+    }
+    for name, series in expected.items():
+        np.testing.assert_allclose(got[name].to_numpy(), series.to_numpy(dtype=float), rtol=1e-9, equal_nan=True, err_msg=name)
+        # Warm-up: the same leading bars are NaN
+        assert got[name].isna().sum() == series.isna().sum(), name
+        assert got[name].isna().sum() < len(close)
@@ -0,0 +1,51 @@
+"""
+PriceCube.build against reindexing every ticker's frame onto the union of
+dates, with tickers over different ranges, gaps and a missing field.
+"""
+from collections import Counter
+import numpy as np
+import pandas as pd
+from price_cube import FIELDS, PriceCube
+
+
+def frames(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    out = {}
+    for k, ticker in enumerate(["AAA", "BBB", "CCC", "DDD"]):
+        dates = pd.bdate_range("2020-01-01", periods=300 + 40 * k)[15 * k:]
+        dates = dates[rng.random(len(dates)) > 0.05] # gaps
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        out[ticker] = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                                    'Volume': rng.lognormal(14, 0.5, len(dates)).round()}, index=dates)
+    out["CCC"] = out["CCC"].drop(columns='Volume')
+    out["EMPTY"] = out["AAA"].iloc[:0]
+    return out
+
+
+def test_matches_reindexed_frames(tmp_path):
+    data = frames()
+    calls = Counter()
+
+    def load(ticker):
+        calls[ticker] += 1
+        return data[ticker]
+
+    cube = PriceCube.build(str(tmp_path), list(data), load)
+    assert calls == Counter({t: 1 for t in data})
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cube.npy", "index.json"] # spill files removed
+
+    dates = data["AAA"].index
+    for frame in data.values():
+        dates = dates.union(frame.index)
+    assert cube.dates.equals(dates)
+
+    for i, (ticker, frame) in enumerate(data.items()):
+        expected = frame.reindex(dates)
+        for j, field in enumerate(FIELDS):
+            column = expected[field].to_numpy(dtype=float) if field in expected else np.full(len(dates), np.nan)
+            np.testing.assert_array_equal(cube.values[i, j], column)
+
+        valid = np.flatnonzero(expected.notna().any(axis=1).to_numpy())
+        assert cube.spans[ticker] == ((int(valid[0]), int(valid[-1]) + 1) if len(valid) else (0, 0))
+        start, stop = cube.spans[ticker]
+        np.testing.assert_array_equal(cube.series(ticker), expected['Close'].to_numpy()[start:stop])
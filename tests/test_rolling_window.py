@@ -0,0 +1,74 @@
+"""
+rw_extreme_flags and rw_extremes against calling rw_top/rw_bottom on every
+bar, on random, rounded (tied) and flat series, and on series too short
+for a confirmed window. RollingExtremaDetector fed one price at a time must
+confirm the same extremes, including on plateaus and equal neighbours.
+"""
+import numpy as np
+import pytest
+from rolling_window import RollingExtremaDetector, rw_bottom, rw_extreme_flags, rw_extremes, rw_top
+
+ORDERS = [1, 2, 3, 5, 10]
+
+
+def series(kind: str, seed: int):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, int(rng.integers(1, 500)))))
+    return {'raw': close, 'whole': close.round(), 'flat': np.full(len(close), 100.0)}[kind]
+
+
+def per_bar(data, order):
+    tops, bottoms = [], []
+    for i in range(len(data)):
+        if rw_top(data, i, order):
+            tops.append([i, i - order, data[i - order]])
+        if rw_bottom(data, i, order):
+            bottoms.append([i, i - order, data[i - order]])
+    return tops, bottoms
+
+
+@pytest.mark.parametrize("kind", ['raw', 'whole', 'flat'])
+@pytest.mark.parametrize("order", ORDERS)
+def test_matches_per_bar(kind, order):
+    for seed in range(20):
+        data = series(kind, seed)
+        tops, bottoms = per_bar(data, order)
+        is_top, is_bottom = rw_extreme_flags(data, order)
+        assert np.flatnonzero(is_top).tolist() == [t[0] for t in tops]
+        assert np.flatnonzero(is_bottom).tolist() == [b[0] for b in bottoms]
+        assert rw_extremes(data, order) == (tops, bottoms)
+
+
+@pytest.mark.parametrize("order", ORDERS)
+def test_short_series(order):
+    # Up to one bar past the first full window, which rw_top/rw_bottom skip
+    for n in range(2 * order + 3):
+        data = np.arange(n, dtype=float) % 3
+        tops, bottoms = per_bar(data, order)
+        is_top, is_bottom = rw_extreme_flags(data, order)
+        assert len(is_top) == len(is_bottom) == n
+        assert np.flatnonzero(is_top).tolist() == [t[0] for t in tops]
+        assert np.flatnonzero(is_bottom).tolist() == [b[0] for b in bottoms]
+        assert rw_extremes(data, order) == (tops, bottoms)
+
+
+def plateaus(seed: int):
+    # Runs of equal prices and equal neighbours a few bars apart
+    rng = np.random.default_rng(seed)
+    return np.repeat(rng.integers(0, 5, 200).astype(float), rng.integers(1, 6, 200))
+
+
+@pytest.mark.parametrize("kind", ['raw', 'whole', 'flat', 'plateaus'])
+@pytest.mark.parametrize("order", ORDERS)
+def test_detector_matches_rw_extremes(kind, order):
+    for seed in range(20):
+        data = plateaus(seed) if kind == 'plateaus' else series(kind, seed)
+        detector = RollingExtremaDetector(order)
+        tops, bottoms = [], []
+        for price in data:
+            top, bottom = detector.push(price)
+            if top is not None:
+                tops.append(top)
+            if bottom is not None:
+                bottoms.append(bottom)
+        assert (tops, bottoms) == rw_extremes(data, order)
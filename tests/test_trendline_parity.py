@@ -0,0 +1,135 @@
+"""
+optimize_slope against the iterative optimizer it replaced.
+
+The old optimizer walked the slope in steps of slope_unit * step, halving the
+step down to MIN_STEP, and accepted lines up to check_trend_line's 1e-5
+past a point. The closed form returns the exact optimum, so the two agree to
+within those two allowances:
+
+    |new slope - old slope| <= 2 * MIN_STEP * slope_unit + SLACK
+
+(SLACK is a slope because the nearest other point is at least one bar from
+the pivot). Where they differ:
+- The old line stops up to one step short of the optimum, or crosses a point
+  by up to SLACK. When it doesn't cross any point, the new line's squared
+  error is never larger.
+- Ties: when another point lies exactly on the line of best fit through the
+  pivot (plateaus and zigzags, common on rounded prices), the old slope keeps
+  the polyfit rounding noise or drifts inside SLACK, the new one is exact.
+- Degenerate: a flat window gives slope_unit 0, and a pivot boxed in by tied
+  points on both sides (collinear prices) makes the old optimizer raise
+  "Derivative failed". The new one returns the only valid slope.
+"""
+import numpy as np
+import pytest
+from trendline_automation import check_trend_line, optimize_slope
+
+MIN_STEP = 0.0001
+SLACK = 1e-5
+
+
+def reference_optimize_slope(support: bool, pivot: int, init_slope: float, y: np.array):
+    # The iterative optimizer, as it was before the closed form
+    slope_unit = (y.max() - y.min()) / len(y)
+    curr_step = 1.0
+    best_slope = init_slope
+    best_err = check_trend_line(support, pivot, init_slope, y)
+    assert best_err >= 0.0
+
+    get_derivative = True
+    derivative = None
+    while curr_step > MIN_STEP:
+        if get_derivative:
+            slope_change = best_slope + slope_unit * MIN_STEP
+            test_err = check_trend_line(support, pivot, slope_change, y)
+            derivative = test_err - best_err
+            if test_err < 0.0:
+                slope_change = best_slope - slope_unit * MIN_STEP
+                test_err = check_trend_line(support, pivot, slope_change, y)
+                derivative = best_err - test_err
+            if test_err < 0.0:
+                raise Exception("Derivative failed. Check your data. ")
+            get_derivative = False
+
+        if derivative > 0.0:
+            test_slope = best_slope - slope_unit * curr_step
+        else:
+            test_slope = best_slope + slope_unit * curr_step
+
+        test_err = check_trend_line(support, pivot, test_slope, y)
+        if test_err < 0 or test_err >= best_err:
+            curr_step *= 0.5
+        else:
+            best_err = test_err
+            best_slope = test_slope
+            get_derivative = True
+    return (best_slope, -best_slope * pivot + y[pivot])
+
+
+def windows(kind: str, count: int = 300, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, int(rng.integers(3, 200)))))
+        yield {'log': np.log(prices), 'raw': prices, 'whole': prices.round(), 'cents': prices.round(2)}[kind]
+
+
+def pivots(y: np.array):
+    x = np.arange(len(y))
+    coefs = np.polyfit(x, y, 1)
+    residuals = y - (coefs[0] * x + coefs[1])
+    return coefs[0], [(True, residuals.argmin()), (False, residuals.argmax())]
+
+
+@pytest.mark.parametrize("kind", ['log', 'raw', 'whole', 'cents'])
+def test_matches_iterative_optimizer(kind):
+    compared = 0
+    for y in windows(kind):
+        x = np.arange(len(y))
+        slope_unit = (y.max() - y.min()) / len(y)
+        init_slope, sides = pivots(y)
+        for support, pivot in sides:
+            try:
+                old = reference_optimize_slope(support, pivot, init_slope, y)
+            except Exception:
+                continue # degenerate, covered below
+            new = optimize_slope(support, pivot, init_slope, y)
+            compared += 1
+
+            assert abs(new[0] - old[0]) <= 2 * MIN_STEP * slope_unit + SLACK
+
+            # The new line never crosses a point, and never fits worse unless the old one did
+            old_diffs, new_diffs = old[0] * x + old[1] - y, new[0] * x + new[1] - y
+            scale = 1e-12 * np.abs(y).max()
+            if support:
+                assert new_diffs.max() <= scale
+                crossed = old_diffs.max() > 0
+            else:
+                assert new_diffs.min() >= -scale
+                crossed = old_diffs.min() < 0
+            if not crossed:
+                assert (new_diffs ** 2).sum() <= (old_diffs ** 2).sum() * (1 + 1e-9)
+    assert compared > 500
+
+
+@pytest.mark.parametrize("y", [
+    np.full(10, 5.0), # flat
+    np.array([3.0, 1.0, 3.0, 1.0, 3.0]), # repeated highs and lows
+    np.array([1.0, 2.0, 1.0, 2.0, 1.0, 2.0]), # zigzag
+    np.array([1.0, 1.0, 1.0, 2.0, 2.0, 2.0]), # plateaus
+    np.array([103.0, 102.0, 101.0]), # collinear, the old optimizer raises
+])
+def test_ties_and_degenerate_windows(y):
+    x = np.arange(len(y))
+    init_slope, sides = pivots(y)
+    for support, pivot in sides:
+        slope, intercept = optimize_slope(support, pivot, init_slope, y)
+        assert check_trend_line(support, pivot, slope, y) >= 0.0
+        assert intercept == -slope * pivot + y[pivot]
+        try:
+            old = reference_optimize_slope(support, pivot, init_slope, y)
+        except Exception:
+            # Pivot boxed in by ties, the only valid line goes through them
+            diffs = slope * x + intercept - y
+            assert np.sum(np.isclose(diffs, 0.0)) >= 2
+            continue
+        assert abs(slope - old[0]) <= 2 * MIN_STEP * (y.max() - y.min()) / len(y) + SLACK
@@ -1,6 +1,8 @@
+import bisect
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from numpy.lib.stride_tricks import sliding_window_view
 
 
 def check_trend_line(support: bool, pivot: int, slope: float, y: np.array):
@@ -24,62 +26,48 @@ def check_trend_line(support: bool, pivot: int, slope: float, y: np.array):
     return err;
 
 
+def optimize_slopes(support: bool, pivots: np.array, init_slopes: np.array, y: np.array):
+    # Exact solution for a batch of windows, no iterations.
+    # y holds one window per row, pivots/init_slopes one value per row.
+    # The line is pinned to (pivot, y[pivot]), so each other point only bounds
+    # the slope from one side and the valid slopes form an interval [lo, hi].
+    # The squared error is a convex quadratic in the slope, so the optimum is
+    # the unconstrained least squares slope clipped to that interval.
+    rows = np.arange(len(y))
+    pivot_y = y[rows, pivots]
+    dx = np.arange(y.shape[1])[None, :] - pivots[:, None]
+    dy = y - pivot_y[:, None]
+
+    # Slope from the pivot to every other point
+    ratio = np.divide(dy, dx, out=np.zeros_like(dy), where=dx != 0)
+    left_max = np.where(dx < 0, ratio, -np.inf).max(axis=1)
+    left_min = np.where(dx < 0, ratio, np.inf).min(axis=1)
+    right_max = np.where(dx > 0, ratio, -np.inf).max(axis=1)
+    right_min = np.where(dx > 0, ratio, np.inf).min(axis=1)
+
+    if support: # Line must stay below every point
+        lo, hi = left_max, right_min
+    else: # Line must stay above every point
+        lo, hi = right_max, left_min
+
+    # init_slope (line of best fit through the pivot) is always valid,
+    # widening by it guards against rounding giving an empty interval
+    lo = np.minimum(lo, init_slopes)
+    hi = np.maximum(hi, init_slopes)
+
+    denom = (dx * dx).sum(axis=1)
+    lsq = np.divide((dx * dy).sum(axis=1), denom, out=np.array(init_slopes, dtype=float), where=denom > 0)
+    best_slopes = np.clip(lsq, lo, hi)
+    return (best_slopes, -best_slopes * pivots + pivot_y)
+
+
 def optimize_slope(support: bool, pivot:int , init_slope: float, y: np.array):
-    
-    # Amount to change slope by. Multiplyed by opt_step
-    slope_unit = (y.max() - y.min()) / len(y) 
-    
-    # Optmization variables
-    opt_step = 1.0
-    min_step = 0.0001
-    curr_step = opt_step # current step
-    
-    # Initiate at the slope of the line of best fit
-    best_slope = init_slope
-    best_err = check_trend_line(support, pivot, init_slope, y)
-    assert(best_err >= 0.0) # Shouldn't ever fail with initial slope
-
-    get_derivative = True
-    derivative = None
-    while curr_step > min_step:
-
-        if get_derivative:
-            # Numerical differentiation, increase slope by very small amount
-            # to see if error increases/decreases. 
-            # Gives us the direction to change slope.
-            slope_change = best_slope + slope_unit * min_step
-            test_err = check_trend_line(support, pivot, slope_change, y)
-            derivative = test_err - best_err;
-            
-            # If increasing by a small amount fails, 
-            # try decreasing by a small amount
-            if test_err < 0.0:
-                slope_change = best_slope - slope_unit * min_step
-                test_err = check_trend_line(support, pivot, slope_change, y)
-                derivative = best_err - test_err
-
-            if test_err < 0.0: # Derivative failed, give up
-                raise Exception("Derivative failed. Check your data. ")
-
-            get_derivative = False
-
-        if derivative > 0.0: # Increasing slope increased error
-            test_slope = best_slope - slope_unit * curr_step
-        else: # Increasing slope decreased error
-            test_slope = best_slope + slope_unit * curr_step
-        
-
-        test_err = check_trend_line(support, pivot, test_slope, y)
-        if test_err < 0 or test_err >= best_err: 
-            # slope failed/didn't reduce error
-            curr_step *= 0.5 # Reduce step size
-        else: # test slope reduced error
-            best_err = test_err 
-            best_slope = test_slope
-            get_derivative = True # Recompute derivative
-    
-    # Optimize done, return best slope and intercept
-    return (best_slope, -best_slope * pivot + y[pivot])
+    # Single window version of optimize_slopes
+    y = np.asarray(y, dtype=float)
+    assert(check_trend_line(support, pivot, init_slope, y) >= 0.0) # Shouldn't ever fail with initial slope
+
+    slopes, intercepts = optimize_slopes(support, np.array([pivot]), np.array([init_slope]), y[None, :])
+    return (slopes[0], intercepts[0])
 
 
 def fit_trendlines_single(data: np.array):
@@ -103,6 +91,92 @@ def fit_trendlines_single(data: np.array):
 
 
 
+class IncrementalTrendlines:
+    # fit_trendlines_single for a series that grows one point at a time.
+    # Keeps running sums for the line of best fit and the upper/lower convex
+    # hulls of the points. The pivot (furthest point from the best fit line) is
+    # always a hull vertex, and the valid slopes for a line pinned there are
+    # bounded by its two hull edges, so fit() is O(log n) and append() is
+    # O(1) amortized.
+
+    def __init__(self):
+        self.y = []
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+        self.upper, self.upper_neg_slopes = [], [] # hull vertices and -slope of edge i -> i + 1
+        self.lower, self.lower_slopes = [], [] # hull vertices and slope of edge i -> i + 1
+        # Set by fit(): smallest difference between the best fit slope and the
+        # hull edges at the pivots. Every other point is at least this much
+        # per bar closer to the best fit line, so near zero a pivot is nearly
+        # tied and rounding may make fit_trendlines_single pick another point.
+        self.pivot_gap = np.inf
+
+    def __len__(self):
+        return len(self.y)
+
+    def _edge_slope(self, a, b):
+        return (self.y[b] - self.y[a]) / (b - a)
+
+    def append(self, value: float):
+        x = len(self.y)
+        self.y.append(value)
+        self.sx += x
+        self.sy += value
+        self.sxx += x * x
+        self.sxy += x * value
+
+        # Monotone chain, drop vertices that no longer make a strict turn
+        while len(self.upper) >= 2 and self._edge_slope(self.upper[-1], x) >= -self.upper_neg_slopes[-1]:
+            self.upper.pop()
+            self.upper_neg_slopes.pop()
+        if self.upper:
+            self.upper_neg_slopes.append(-self._edge_slope(self.upper[-1], x))
+        self.upper.append(x)
+
+        while len(self.lower) >= 2 and self._edge_slope(self.lower[-1], x) <= self.lower_slopes[-1]:
+            self.lower.pop()
+            self.lower_slopes.pop()
+        if self.lower:
+            self.lower_slopes.append(self._edge_slope(self.lower[-1], x))
+        self.lower.append(x)
+
+    def _pinned_slope(self, pivot: int, lo: float, hi: float, init_slope: float):
+        # Least squares slope of a line through the pivot, from the running sums
+        n, yp = len(self.y), self.y[pivot]
+        sum_dx_dy = self.sxy - pivot * self.sy - yp * self.sx + n * pivot * yp
+        sum_dx_dx = self.sxx - 2 * pivot * self.sx + n * pivot * pivot
+        if sum_dx_dx == 0:
+            return init_slope
+        lo = min(lo, init_slope)
+        hi = max(hi, init_slope)
+        return min(max(sum_dx_dy / sum_dx_dx, lo), hi)
+
+    def fit(self):
+        n = len(self.y)
+        denom = n * self.sxx - self.sx * self.sx
+        slope = (n * self.sxy - self.sx * self.sy) / denom if denom != 0 else 0.0
+
+        # Lower pivot: first point minimising y - slope * x, at the hull vertex
+        # where the edge slopes cross the best fit slope
+        j = bisect.bisect_left(self.lower_slopes, slope)
+        pivot = self.lower[j]
+        lo = self.lower_slopes[j - 1] if j > 0 else -np.inf
+        hi = self.lower_slopes[j] if j < len(self.lower_slopes) else np.inf
+        self.pivot_gap = min(slope - lo, hi - slope)
+        support_slope = self._pinned_slope(pivot, lo, hi, slope)
+        support_coefs = (support_slope, -support_slope * pivot + self.y[pivot])
+
+        # Upper pivot: first point maximising y - slope * x
+        j = bisect.bisect_left(self.upper_neg_slopes, -slope)
+        pivot = self.upper[j]
+        lo = -self.upper_neg_slopes[j] if j < len(self.upper_neg_slopes) else -np.inf
+        hi = -self.upper_neg_slopes[j - 1] if j > 0 else np.inf
+        self.pivot_gap = min(self.pivot_gap, slope - lo, hi - slope)
+        resist_slope = self._pinned_slope(pivot, lo, hi, slope)
+        resist_coefs = (resist_slope, -resist_slope * pivot + self.y[pivot])
+
+        return (support_coefs, resist_coefs)
+
+
 def fit_trendlines_high_low(high: np.array, low: np.array, close: np.array):
     x = np.arange(len(close))
     coefs = np.polyfit(x, close, 1)
@@ -117,6 +191,51 @@ def fit_trendlines_high_low(high: np.array, low: np.array, close: np.array):
     return (support_coefs, resist_coefs)
 
 
+def rolling_trendlines_high_low(high: np.array, low: np.array, close: np.array, lookback: int, chunk_size: int = 4096):
+    # fit_trendlines_high_low for every window of `lookback` bars ending at each index.
+    # Returns (support_slope, support_intercept, resist_slope, resist_intercept) arrays,
+    # NaN before the first full window. Intercepts are relative to the window start,
+    # same as calling fit_trendlines_high_low on the window.
+    # All windows are solved together on overlapping views, in chunks to bound memory.
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+
+    support_slope = np.full(n, np.nan)
+    support_intercept = np.full(n, np.nan)
+    resist_slope = np.full(n, np.nan)
+    resist_intercept = np.full(n, np.nan)
+    if lookback < 2 or n < lookback:
+        return support_slope, support_intercept, resist_slope, resist_intercept
+
+    high_w = sliding_window_view(high, lookback)
+    low_w = sliding_window_view(low, lookback)
+    close_w = sliding_window_view(close, lookback)
+
+    # Line of best fit of close per window, x is the same for every window
+    x = np.arange(lookback)
+    x_dev = x - x.mean()
+    x_var = (x_dev ** 2).sum()
+
+    for start in range(0, len(close_w), chunk_size):
+        stop = min(start + chunk_size, len(close_w))
+        h, l, c = high_w[start:stop], low_w[start:stop], close_w[start:stop]
+
+        # coefs[0] = slope, coefs[1] = intercept
+        slopes = c @ x_dev / x_var
+        intercepts = c.mean(axis=1) - slopes * x.mean()
+        line_points = slopes[:, None] * x + intercepts[:, None]
+        upper_pivots = (h - line_points).argmax(axis=1)
+        lower_pivots = (l - line_points).argmin(axis=1)
+
+        out = slice(start + lookback - 1, stop + lookback - 1)
+        support_slope[out], support_intercept[out] = optimize_slopes(True, lower_pivots, slopes, l)
+        resist_slope[out], resist_intercept[out] = optimize_slopes(False, upper_pivots, slopes, h)
+
+    return support_slope, support_intercept, resist_slope, resist_intercept
+
+
 if __name__ == '__main__':
 
     # Load data
@@ -130,15 +249,10 @@ if __name__ == '__main__':
     lookback = 30
 
 
-    support_slope = [np.nan] * len(data)
-    resist_slope = [np.nan] * len(data)
-    for i in range(lookback - 1, len(data)):
-        candles = data.iloc[i - lookback + 1: i + 1]
-        support_coefs, resist_coefs =  fit_trendlines_high_low(candles['high'], 
-                                                               candles['low'], 
-                                                               candles['close'])
-        support_slope[i] = support_coefs[0]
-        resist_slope[i] = resist_coefs[0]
+    support_slope, _, resist_slope, _ = rolling_trendlines_high_low(data['high'].to_numpy(),
+                                                                     data['low'].to_numpy(),
+                                                                     data['close'].to_numpy(),
+                                                                     lookback)
 
     data['support_slope'] = support_slope
     data['resist_slope'] = resist_slope